@@ -0,0 +1,133 @@
+import asyncio
+from typing import Any, List, Optional, Set, Tuple
+
+from core.openai_client import OpenAIClient
+from core.logging.config import get_logger
+
+logger = get_logger("batching_embedding_client")
+
+
+class BatchingEmbeddingClient:
+    """
+    OpenAIClient wrapper that coalesces concurrent get_embeddings calls into batched requests.
+
+    Texts submitted within batch_window seconds of each other are sent in one embeddings
+    request (up to max_batch texts). Every other attribute is delegated to the wrapped
+    client, so it can be used wherever an OpenAIClient is expected.
+    """
+
+    def __init__(self, client: Optional[OpenAIClient] = None, batch_window: float = 0.008, max_batch: int = 128):
+        self._client = client or OpenAIClient()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        # Every caller future not yet settled, so close() can fail them instead of leaving them hanging
+        self._pending: Set[asyncio.Future] = set()
+
+        logger.info(f"Batching embedding client initialized (window={batch_window * 1000:.0f}ms, max_batch={max_batch})")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Get embeddings for a list of texts, batched together with concurrent callers.
+
+        Args:
+            texts (List[str]): List of texts to embed
+
+        Returns:
+            List[List[float]]: List of embedding vectors
+        """
+        if not texts:
+            return []
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.add(future)
+            future.add_done_callback(self._pending.discard)
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        # The queue and worker are bound to the loop they were created on
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            # Texts left on the old queue would never be sent, so fail their callers now
+            self._abandon("event loop changed")
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    def _abandon(self, reason: str) -> None:
+        """Cancel the worker and in-flight batches and fail every unsettled call, whichever loop they are on."""
+        tasks = list(self._in_flight)
+        if self._worker is not None and not self._worker.done():
+            tasks.append(self._worker)
+        for task in tasks:
+            _call_on_loop(task.get_loop(), task.cancel)
+        self._in_flight = set()
+        for future in list(self._pending):
+            _call_on_loop(future.get_loop(), _fail_future, future, reason)
+        self._pending = set()
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            await asyncio.sleep(self.batch_window)
+            batch = [first]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Each batch is sent on its own so a slow request doesn't hold up the next window
+            task = asyncio.create_task(self._flush(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await self._client.get_embeddings(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    async def close(self) -> None:
+        """Stop the batching worker, fail any pending calls and close the wrapped client."""
+        loop = asyncio.get_running_loop()
+        tasks = [task for task in self._in_flight if task.get_loop() is loop]
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            tasks.append(self._worker)
+        self._abandon("client closed")
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+        await self._client.close()
+
+
+def _call_on_loop(loop: asyncio.AbstractEventLoop, callback, *args) -> None:
+    """Run callback now if loop is the running one, later on loop otherwise; skipped once loop is closed."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is running:
+        callback(*args)
+    elif not loop.is_closed():
+        loop.call_soon_threadsafe(callback, *args)
+
+
+def _fail_future(future: asyncio.Future, reason: str) -> None:
+    if not future.done():
+        future.set_exception(RuntimeError(reason))
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Tuple
 from datetime import datetime
 from core.redis_memory_manager import RedisMemoryManager
 from core.qdrant_client import QdrantMemoryClient
@@ -8,9 +8,28 @@ from core.openai_client import OpenAIClient
 from core.logging.config import get_logger
 import re
 import asyncio
+import msgspec
 
 logger = get_logger("hybrid_memory_manager")
 
+
+class MemoryContext(NamedTuple):
+    """Combined memory context for one user turn, as returned by get_context_for_user."""
+    short_term_context: str = ""
+    long_term_context: str = ""
+    pdf_context: str = ""
+    # Immutable defaults: a list default would be one object shared by every instance
+    short_term_memories: Sequence[Dict[str, Any]] = ()
+    long_term_memories: Sequence[Dict[str, Any]] = ()
+    pdf_memories: Sequence[Dict[str, Any]] = ()
+    similar_memories_count: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        """True when there is no formatted context to add to the prompt."""
+        return not (self.short_term_context or self.long_term_context or self.pdf_context)
+
+
 class HybridMemoryManager:
     """
     Hybrid memory manager combining Redis (short-term) and Qdrant (long-term).
@@ -18,11 +37,25 @@ class HybridMemoryManager:
     Design Pattern: Facade Pattern - provides a unified interface to both memory systems
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        openai_client: Optional[OpenAIClient] = None,
+        qdrant_memory: Optional[QdrantMemoryClient] = None,
+        pdf_memory: Optional[QdrantMemoryClient] = None
+    ):
         self.redis_memory = RedisMemoryManager()
-        self.qdrant_memory = QdrantMemoryClient.for_conversations()
-        self.pdf_memory = QdrantMemoryClient.for_pdfs()  # Add PDF/knowledge base Qdrant client
-        self.openai_client = OpenAIClient()
+        # Injected Qdrant clients (the app's startup clients) are shared and closed by their owner;
+        # only the ones built here are closed by close()
+        self._owned_qdrant_clients: List[QdrantMemoryClient] = []
+        if qdrant_memory is None:
+            qdrant_memory = QdrantMemoryClient.for_conversations()
+            self._owned_qdrant_clients.append(qdrant_memory)
+        if pdf_memory is None:
+            pdf_memory = QdrantMemoryClient.for_pdfs()
+            self._owned_qdrant_clients.append(pdf_memory)
+        self.qdrant_memory = qdrant_memory
+        self.pdf_memory = pdf_memory  # PDF/knowledge base Qdrant client
+        self.openai_client = openai_client or OpenAIClient()
         
         logger.info("Hybrid memory manager initialized")
     
@@ -61,14 +94,16 @@ class HybridMemoryManager:
             Dict with memory storage results
         """
         try:
-            # Always add to short-term memory (Redis)
-            await self.redis_memory.add_conversation_turn(user_id, user_message, assistant_response)
-            
             # Combine user message and assistant response for evaluation
             combined_content = f"User: {user_message}\nAssistant: {assistant_response}"
             
-            # Evaluate if this should be stored in long-term memory
-            evaluation = MemoryStrategyFactory.evaluate_content(combined_content, metadata or {})
+            # Always add to short-term memory (Redis). Meanwhile, evaluate whether this
+            # should be stored in long-term memory; the keyword scoring is CPU-bound, so
+            # it runs in a worker thread instead of on the event loop
+            _, evaluation = await asyncio.gather(
+                self.redis_memory.add_conversation_turn(user_id, user_message, assistant_response),
+                asyncio.to_thread(MemoryStrategyFactory.evaluate_content, combined_content, metadata or {})
+            )
             
             result = {
                 "short_term_stored": True,
@@ -137,7 +172,7 @@ class HybridMemoryManager:
         include_similar: bool = True,
         pdf_limit: int = 5,
         current_user_message: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> MemoryContext:
         """
         Get combined context from short-term, long-term, and PDF/document memory.
         
@@ -150,27 +185,17 @@ class HybridMemoryManager:
             current_user_message (Optional[str]): The current user's message for PDF/document retrieval.
         
         Returns:
-            Dict with combined context, including both formatted strings and raw memory lists:
-            {
-                "short_term_context": str,
-                "short_term_memories": list,
-                "long_term_context": str,
-                "long_term_memories": list,
-                "pdf_context": str,
-                "pdf_memories": list,
-                "short_term_count": int,
-                "long_term_count": int,
-                "pdf_count": int,
-                "similar_memories_count": int
-            }
+            MemoryContext: Formatted context strings plus the raw memory lists they were built from
         """
         if current_user_message is None:
             raise ValueError("get_context_for_user:current_user_message cannot be None")
 
         try:
             logger.info(f"[get_context_for_user] Start for user_id={user_id}, short_term_limit={short_term_limit}, long_term_limit={long_term_limit}, include_similar={include_similar}, pdf_limit={pdf_limit}")
-            # Get short-term context (Redis)
-            short_term_context = await self.redis_memory.get_recent_context(user_id, short_term_limit)
+            # Redis, Qdrant conversations and the PDF knowledge base are independent, so fetch them concurrently
+            short_term_context, long_term_memories, pdf_memories = await self._gather_context_sources(
+                user_id, short_term_limit, long_term_limit, pdf_limit, current_user_message
+            )
             logger.debug(f"[get_context_for_user] short_term_context: {short_term_context}")
             short_term_memories = []
             if short_term_context:
@@ -178,11 +203,6 @@ class HybridMemoryManager:
                     if line.strip():
                         short_term_memories.append({"text": line.strip()})
             logger.debug(f"[get_context_for_user] short_term_memories: {short_term_memories}")
-
-            # Get long-term context (Qdrant conversations)
-            long_term_memories = await self.qdrant_memory.get_user_memories(
-                user_id, limit=long_term_limit
-            )
             logger.debug(f"[get_context_for_user] long_term_memories: {long_term_memories}")
 
             # Only use similar memories as a fallback if long_term_memories is empty
@@ -201,23 +221,20 @@ class HybridMemoryManager:
                     unique_long_term.append(memory)
             logger.debug(f"[get_context_for_user] unique_long_term: {unique_long_term}")
 
-            # PDF/document context retrieval (Qdrant knowledge base)
-            pdf_memories = []
+            # Format PDF/document context (Qdrant knowledge base)
             pdf_context = ""
-            if current_user_message:
-                pdf_memories = await self.amplify_pdf_context(current_user_message, pdf_limit=pdf_limit)
-                if pdf_memories:
-                    pdf_context = "=== DOCUMENT KNOWLEDGE ===\n"
-                    for memory in pdf_memories:
-                        timestamp = memory.get("timestamp")
-                        if timestamp:
-                            try:
-                                ts_fmt = datetime.fromisoformat(timestamp).strftime("%Y-%m-%d %H:%M")
-                                pdf_context += f"[{ts_fmt}] {memory['content']}\n"
-                            except Exception:
-                                pdf_context += f"{memory['content']}\n"
-                        else:
+            if pdf_memories:
+                pdf_context = "=== DOCUMENT KNOWLEDGE ===\n"
+                for memory in pdf_memories:
+                    timestamp = memory.get("timestamp")
+                    if timestamp:
+                        try:
+                            ts_fmt = datetime.fromisoformat(timestamp).strftime("%Y-%m-%d %H:%M")
+                            pdf_context += f"[{ts_fmt}] {memory['content']}\n"
+                        except Exception:
                             pdf_context += f"{memory['content']}\n"
+                    else:
+                        pdf_context += f"{memory['content']}\n"
             logger.debug(f"[get_context_for_user] pdf_context: {pdf_context}")
 
             # Format long-term context
@@ -229,28 +246,61 @@ class HybridMemoryManager:
                     long_term_context += f"[{timestamp}] {memory['content']}\n"
             logger.debug(f"[get_context_for_user] long_term_context: {long_term_context}")
 
-            result = {
-                "short_term_context": short_term_context,
-                "short_term_memories": short_term_memories,
-                "long_term_context": long_term_context,
-                "long_term_memories": unique_long_term,
-                "pdf_context": pdf_context,
-                "pdf_memories": pdf_memories,
-                "short_term_count": len(short_term_memories),
-                "long_term_count": len(unique_long_term),
-                "pdf_count": len(pdf_memories),
-                "similar_memories_count": len(similar_memories)
-            }
+            result = MemoryContext(
+                short_term_context=short_term_context or "",
+                long_term_context=long_term_context,
+                pdf_context=pdf_context,
+                short_term_memories=short_term_memories,
+                long_term_memories=unique_long_term,
+                pdf_memories=pdf_memories,
+                similar_memories_count=len(similar_memories)
+            )
             logger.info(f"[get_context_for_user] Result for user_id={user_id}: "
-                        f"short_term_count={result['short_term_count']}, "
-                        f"long_term_count={result['long_term_count']}, "
-                        f"pdf_count={result['pdf_count']}, "
-                        f"similar_memories_count={result['similar_memories_count']}")
+                        f"short_term_count={len(short_term_memories)}, "
+                        f"long_term_count={len(unique_long_term)}, "
+                        f"pdf_count={len(pdf_memories)}, "
+                        f"similar_memories_count={len(similar_memories)}")
             return result
         except Exception as e:
             logger.error(f"Error getting context for user {user_id}: {e}", exc_info=True)
             raise
     
+    async def _gather_context_sources(
+        self,
+        user_id: str,
+        short_term_limit: int,
+        long_term_limit: int,
+        pdf_limit: int,
+        current_user_message: str
+    ) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Fetch short-term, long-term and PDF context concurrently.
+
+        A failing source is logged and replaced with an empty result so one backend
+        doesn't fail the whole request.
+
+        Returns:
+            Tuple of (short_term_context, long_term_memories, pdf_memories)
+        """
+        async def no_pdf_context() -> List[Dict[str, Any]]:
+            return []
+
+        results = await asyncio.gather(
+            self.redis_memory.get_recent_context(user_id, short_term_limit),
+            self.qdrant_memory.get_user_memories(user_id, limit=long_term_limit),
+            self.amplify_pdf_context(current_user_message, pdf_limit=pdf_limit) if current_user_message else no_pdf_context(),
+            return_exceptions=True
+        )
+        sources = ("short-term (Redis)", "long-term (Qdrant)", "PDF (Qdrant)")
+        defaults = ("", [], [])
+        context = []
+        for source, default, result in zip(sources, defaults, results):
+            if isinstance(result, Exception):
+                logger.error(f"[get_context_for_user] Failed to fetch {source} context for user {user_id}: {result}")
+                result = default
+            context.append(result)
+        return tuple(context)
+    
     async def search_memories(
         self, 
         query: str, 
@@ -295,7 +345,7 @@ class HybridMemoryManager:
             qdrant_info = await self.qdrant_memory.get_collection_info()
             
             return {
-                "redis": redis_stats.dict(),
+                "redis": msgspec.structs.asdict(redis_stats),
                 "qdrant": qdrant_info,
                 "total_memories": qdrant_info.get("points_count", 0)
             }
@@ -326,7 +376,8 @@ class HybridMemoryManager:
         """Close all memory connections."""
         try:
             await self.redis_memory.close()
-            await self.qdrant_memory.close()
+            for qdrant_client in self._owned_qdrant_clients:
+                await qdrant_client.close()
             logger.info("All memory connections closed")
         except Exception as e:
             logger.error(f"Error closing memory connections: {e}", exc_info=True)
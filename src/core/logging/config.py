@@ -21,6 +21,12 @@ def setup_logging(env: str = "development"):
     # Clear any existing handlers
     root_logger.handlers.clear()
     
+    # None of the formatters below print thread/process fields, so skip
+    # collecting them for every LogRecord
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     # Create formatters
     detailed_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from core.logging.config import get_logger
+
+logger = get_logger("metrics")
+
+_LATENCY_BUCKETS = (.001, .005, .01, .05, .1, .5, 1, 2, 5)
+
+CACHE_HITS = Counter("rag_cache_hits_total", "Cache hits", ["kind"])
+CACHE_MISSES = Counter("rag_cache_misses_total", "Cache misses", ["kind"])
+
+# Per-stage latency of process_user_message (embedding, context, build_messages, openai, memory_write)
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Latency of RAG pipeline stages", ["stage"], buckets=_LATENCY_BUCKETS)
+
+# End-to-end latency of process_user_message, split by semantic cache outcome
+REQUEST_SECONDS = Histogram("rag_request_seconds", "Latency of RAG requests", ["cache"], buckets=_LATENCY_BUCKETS)
+
+
+async def log_cache_stats_periodically(cache, interval: float = 60.0) -> None:
+    """
+    Log the semantic cache hit rate every interval seconds until cancelled.
+
+    Args:
+        cache: A SemanticResponseCache (anything with get_stats())
+        interval (float): Seconds between log lines
+    """
+    while True:
+        await asyncio.sleep(interval)
+        stats = cache.get_stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate: Optional[float] = stats["hits"] / lookups if lookups else None
+        logger.info(
+            "Semantic cache: %d hits, %d misses, hit rate %s, %d entries",
+            stats["hits"], stats["misses"],
+            f"{hit_rate:.1%}" if hit_rate is not None else "n/a",
+            stats["entries"]
+        )
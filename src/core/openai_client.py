@@ -1,5 +1,7 @@
 import os
 import logging
+import httpx
+import orjson
 from typing import List, Dict, Any, Optional
 from openai import AsyncOpenAI
 from core.logging.config import get_logger
@@ -14,12 +16,22 @@ class OpenAIClient:
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # One pooled HTTP client for the process lifetime; closed in close()
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        self.client = AsyncOpenAI(api_key=self.api_key, http_client=self.http_client)
         self.model = os.getenv("OPENAI_MODEL", "gpt-4.1-2025-04-14")
         self.embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
         
         logger.info(f"OpenAI client initialized with model: {self.model}")
     
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
+        logger.info("OpenAI client closed")
+    
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Get embeddings for a list of texts.
@@ -167,7 +179,8 @@ class OpenAIClient:
             {"role": "user", "content": prompt}
         ]
         response = await self.get_chat_completion(messages, temperature=0.0, max_tokens=64)
-        keywords = [kw.strip() for kw in response.split(",") if kw.strip()]
+        # Plain split/strip (no regex); each part is stripped once. Spaces inside a keyword are kept
+        keywords = [kw for part in response.split(",") if (kw := part.strip())]
         return keywords[:n]
 
     async def rerank_chunks_with_threshold(self, user_message: str, chunks: List[Dict[str, Any]], threshold: float = 0.5) -> List[Dict[str, Any]]:
@@ -189,16 +202,17 @@ class OpenAIClient:
             {"role": "system", "content": "You are an expert at evaluating document relevance."},
             {"role": "user", "content": prompt}
         ]
-        import json
         response = await self.get_chat_completion(messages, temperature=0.0, max_tokens=256)
         try:
-            scores = json.loads(response)
+            scores = orjson.loads(response)
         except Exception:
             # fallback: if parsing fails, return all
             return chunks
-        # Filter and sort chunks by score
+        # Filter and sort chunk positions by score (descending), then map back to chunks once
         indexed_scores = {item['index']-1: item['score'] for item in scores if 'index' in item and 'score' in item}
-        filtered = [chunk for i, chunk in enumerate(chunks) if indexed_scores.get(i, 0) >= threshold]
-        # Optionally, sort by score descending
-        filtered = sorted(filtered, key=lambda c: indexed_scores.get(chunks.index(c), 0), reverse=True)
-        return filtered 
\ No newline at end of file
+        selected = sorted(
+            (i for i in range(len(chunks)) if indexed_scores.get(i, 0) >= threshold),
+            key=indexed_scores.__getitem__,
+            reverse=True
+        )
+        return [chunks[i] for i in selected] 
\ No newline at end of file
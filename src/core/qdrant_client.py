@@ -1,16 +1,27 @@
+import asyncio
 import os
 import logging
 import uuid
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, MatchAny,
+    FilterSelector, PayloadSchemaType
+)
 from core.logging.config import get_logger
 
 logger = get_logger("qdrant_client")
 
 class QdrantMemoryClient:
     """Qdrant client for long-term memory storage with vector embeddings."""
+
+    # Payload fields used in filters; indexed so filtering doesn't scan every payload
+    PAYLOAD_INDEXES = {
+        "metadata.document_id": PayloadSchemaType.KEYWORD,
+        "user_id": PayloadSchemaType.KEYWORD,
+        "memory_type": PayloadSchemaType.KEYWORD,
+    }
     
     def __init__(self, collection_name: str, qdrant_url: str = None):
         if not collection_name:
@@ -60,6 +71,17 @@ class QdrantMemoryClient:
             logger.info(f"Created Qdrant collection: {name}")
         except Exception as e:
             logger.warning(f"Collection {name} might already exist: {e}")
+
+        # Indexes are ensured even when the collection already existed
+        for field_name, field_schema in self.PAYLOAD_INDEXES.items():
+            try:
+                await self.client.create_payload_index(
+                    collection_name=name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+            except Exception as e:
+                logger.warning(f"Could not create payload index {field_name} on {name}: {e}")
     
     async def store_memory_item(
         self, 
@@ -107,7 +129,76 @@ class QdrantMemoryClient:
         except Exception as e:
             logger.error(f"Error storing memory item: {e}")
             raise
-    
+
+    async def store_memory_items(
+        self,
+        contents: List[str],
+        embeddings: List[List[float]],
+        user_id: str,
+        memory_type: str = "conversation",
+        metadata: Optional[Dict[str, Any]] = None,
+        batch_size: int = 256,
+        max_concurrency: int = 4
+    ) -> List[str]:
+        """
+        Store many memory items sharing the same user, type and metadata.
+
+        Points are upserted in sub-batches dispatched concurrently (bounded by a semaphore)
+        with wait=False, so Qdrant acknowledges before indexing finishes.
+
+        Args:
+            contents (List[str]): The memory contents
+            embeddings (List[List[float]]): One vector embedding per content
+            user_id (str): User identifier
+            memory_type (str): Type of memory (conversation, pdf_chunk, etc.)
+            metadata (Optional[Dict]): Additional metadata applied to every item
+            batch_size (int): Number of points per upsert request
+            max_concurrency (int): Maximum number of upsert requests in flight
+
+        Returns:
+            List[str]: The point IDs, in input order
+        """
+        if len(contents) != len(embeddings):
+            raise ValueError("contents and embeddings must have the same length")
+        await self._ensure_connected()
+
+        timestamp = datetime.utcnow().isoformat()
+        points = [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=embedding,
+                payload={
+                    "content": content,
+                    "user_id": user_id,
+                    "memory_type": memory_type,
+                    "timestamp": timestamp,
+                    "metadata": metadata or {}
+                }
+            )
+            for content, embedding in zip(contents, embeddings)
+        ]
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def upsert_batch(batch: List[PointStruct]) -> None:
+            async with semaphore:
+                await self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=False
+                )
+
+        try:
+            await asyncio.gather(*(
+                upsert_batch(points[i:i + batch_size])
+                for i in range(0, len(points), batch_size)
+            ))
+            logger.info(f"Stored {len(points)} memory items for user {user_id}")
+            return [point.id for point in points]
+        except Exception as e:
+            logger.error(f"Error storing memory items: {e}")
+            raise
+
     async def search_similar_memories(
         self, 
         query_embedding: List[float], 
@@ -315,3 +406,40 @@ class QdrantMemoryClient:
             collection_name=self.collection_name,
             points_selector=point_ids
         )
+
+    async def delete_points_by_document_ids(self, document_ids: List[str]) -> list:
+        """
+        Delete all points whose metadata.document_id is in document_ids.
+        Filtering happens server-side on the metadata.document_id payload index.
+        Args:
+            document_ids (List[str]): Document IDs whose points should be deleted.
+        Returns:
+            list: IDs of the deleted points.
+        """
+        await self._ensure_connected()
+        if not document_ids:
+            return []
+        document_filter = Filter(
+            must=[FieldCondition(key="metadata.document_id", match=MatchAny(any=document_ids))]
+        )
+        point_ids = []
+        offset = None
+        while True:
+            points, next_offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=document_filter,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+                limit=1000
+            )
+            point_ids.extend(point.id for point in points)
+            if not next_offset:
+                break
+            offset = next_offset
+        if point_ids:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=document_filter)
+            )
+        return point_ids
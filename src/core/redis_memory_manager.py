@@ -1,14 +1,16 @@
 # redis_memory_manager.py
-import json
 import logging
 import os
-from typing import List, Dict, Any
+import itertools
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
 from core.logging.config import get_logger
 from database.redis_connection import get_redis_client
-from features.models.pydantic.memory import ConversationTurn, UserSession, MemoryStats
+from features.models.msgspec.memory import ConversationTurn, UserSession, MemoryStats
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,13 +20,32 @@ logger = get_logger("redis_memory_manager")
 class RedisMemoryManager:
     """Redis-based memory manager for short-term context."""
 
-    def __init__(self, redis_url: str = None, ttl_hours: int = None):
+    def __init__(
+        self,
+        redis_url: str = None,
+        ttl_hours: int = None,
+        max_turns: int = None,
+        context_cache_ttl: float = 2.0,
+        context_cache_size: int = 1024
+    ):
         # Always read from environment at init time for testability
         env_redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         env_ttl_hours = int(os.getenv("REDIS_TTL_HOURS", "24"))
+        env_max_turns = int(os.getenv("REDIS_MAX_TURNS", "50"))
         self.redis_url = redis_url or env_redis_url
         self.ttl_hours = ttl_hours or env_ttl_hours
+        # Conversation lists are trimmed to this many turns; only the most recent are ever read
+        self.max_turns = max_turns or env_max_turns
         self.redis_client = None
+        # Per-process L1 cache of get_recent_context results: user_id -> {limit: (stored_at, context)}.
+        # Writes through this manager invalidate the user; writes from other processes show up after the TTL.
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_size = context_cache_size
+        self._context_cache: "OrderedDict[str, Dict[int, Tuple[float, str]]]" = OrderedDict()
+        # Write generation per user, so a read that raced a write doesn't cache the old context.
+        # Values come from one process-wide counter and never repeat; only recently written users are kept.
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._generation_counter = itertools.count(1)
 
     async def connect(self):
         """Initialize Redis client connection."""
@@ -47,25 +68,55 @@ class RedisMemoryManager:
             assistant_response=assistant_response
         )
         
-        await self.redis_client.lpush(conversation_key, turn.to_json())
-        await self.redis_client.expire(conversation_key, self.ttl_hours * 3600)
+        # LPUSH + LTRIM + EXPIRE in one round trip
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.lpush(conversation_key, turn.to_json())
+            pipe.ltrim(conversation_key, 0, self.max_turns - 1)
+            pipe.expire(conversation_key, self.ttl_hours * 3600)
+            await pipe.execute()
+        self._invalidate_context(user_id)
         logger.debug(f"Added conversation turn for user {user_id}")
 
     async def get_recent_context(self, user_id: str, limit: int = 5) -> str:
-        """Get recent context using the ConversationTurn model."""
+        """Get recent context using the ConversationTurn model, served from the L1 cache when fresh."""
+        now = time.monotonic()
+        cached = self._context_cache.get(user_id, {}).get(limit)
+        if cached is not None and now - cached[0] < self.context_cache_ttl:
+            self._context_cache.move_to_end(user_id)
+            return cached[1]
+
+        generation = self._generations.get(user_id)
         await self._ensure_connected()
         conversation_key = f"conversation:{user_id}"
         recent_turns_json = await self.redis_client.lrange(conversation_key, 0, limit - 1)
 
-        if not recent_turns_json:
-            return ""
-
         context_parts = []
-        for turn_json in reversed(recent_turns_json):
+        for turn_json in reversed(recent_turns_json or []):
             turn = ConversationTurn.from_json(turn_json)
-            context_parts.append(f"[{turn.timestamp.strftime('%H:%M')}] User: {turn.user_message}")
-            context_parts.append(f"[{turn.timestamp.strftime('%H:%M')}] Assistant: {turn.assistant_response}")
-        return "\n".join(context_parts)
+            time_label = turn.timestamp.strftime('%H:%M')
+            context_parts.append(f"[{time_label}] User: {turn.user_message}")
+            context_parts.append(f"[{time_label}] Assistant: {turn.assistant_response}")
+        context = "\n".join(context_parts)
+        # A write landed while lrange was in flight; the result may predate it, so don't cache it
+        if self._generations.get(user_id) == generation:
+            self._cache_context(user_id, limit, now, context)
+        return context
+
+    def _cache_context(self, user_id: str, limit: int, now: float, context: str) -> None:
+        if self.context_cache_ttl <= 0:
+            return
+        self._context_cache.setdefault(user_id, {})[limit] = (now, context)
+        self._context_cache.move_to_end(user_id)
+        # Drop the least recently used user once the cache is full
+        while len(self._context_cache) > self.context_cache_size:
+            self._context_cache.popitem(last=False)
+
+    def _invalidate_context(self, user_id: str) -> None:
+        self._context_cache.pop(user_id, None)
+        self._generations[user_id] = next(self._generation_counter)
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self.context_cache_size:
+            self._generations.popitem(last=False)
 
     async def get_user_session_data(self, user_id: str) -> UserSession:
         """Get user session data using the UserSession model."""
@@ -81,7 +132,7 @@ class RedisMemoryManager:
         session_key = f"session:{user_id}"
         
         # Create or update session
-        session = UserSession(user_id=user_id, **data)
+        session = UserSession.from_data(user_id, data)
         redis_data = session.to_redis_dict()
 
         await self.redis_client.hset(session_key, mapping=redis_data)
@@ -92,22 +143,30 @@ class RedisMemoryManager:
         """Clear user memory."""
         await self._ensure_connected()
         await self.redis_client.delete(f"conversation:{user_id}", f"session:{user_id}")
+        self._invalidate_context(user_id)
         logger.info(f"Cleared memory for user {user_id}")
 
     async def get_memory_stats(self) -> MemoryStats:
         """Get memory statistics using the MemoryStats model."""
         await self._ensure_connected()
-        conversation_keys = await self.redis_client.keys("conversation:*")
-        session_keys = await self.redis_client.keys("session:*")
+        # SCAN walks the keyspace in batches instead of blocking Redis like KEYS does
+        active_conversations = await self._count_keys("conversation:*")
+        active_sessions = await self._count_keys("session:*")
         info = await self.redis_client.info("memory")
 
         return MemoryStats(
-            active_conversations=len(conversation_keys),
-            active_sessions=len(session_keys),
+            active_conversations=active_conversations,
+            active_sessions=active_sessions,
             memory_usage=info.get("used_memory_human", "N/A"),
             ttl_hours=self.ttl_hours
         )
 
+    async def _count_keys(self, pattern: str, batch_size: int = 1000) -> int:
+        count = 0
+        async for _ in self.redis_client.scan_iter(match=pattern, count=batch_size):
+            count += 1
+        return count
+
     async def close(self):
         """Close Redis connection."""
         if self.redis_client:
@@ -0,0 +1,126 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.logging.config import get_logger
+
+logger = get_logger("semantic_cache")
+
+
+class SemanticResponseCache:
+    """
+    Per-user cache of (query embedding -> response) pairs, looked up by cosine similarity.
+
+    Embeddings are L2-normalized and stacked into one matrix per user, so a lookup is a
+    single inner-product scan (the same search a flat IP index performs). Entries expire
+    after ttl_seconds and the least recently used entry is evicted once a user holds
+    max_entries.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 300, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+
+        logger.info(f"Semantic response cache initialized (threshold={threshold}, ttl={ttl_seconds}s, max_entries={max_entries})")
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.ndim != 1 or vector.size == 0:
+            raise ValueError("embedding must be a non-empty 1-D vector")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, user_id: str, embedding: List[float]) -> Optional[str]:
+        """
+        Return the cached response for the most similar previous query, if similar enough.
+
+        Args:
+            user_id (str): User identifier
+            embedding (List[float]): Embedding of the incoming query
+
+        Returns:
+            Optional[str]: The cached response on a hit, None on a miss
+        """
+        now = time.monotonic()
+        self._evict_expired(user_id, now)
+
+        vectors = self._vectors.get(user_id)
+        if vectors is not None and len(vectors):
+            query = self._normalize(embedding)
+            if query.shape[0] == vectors.shape[1]:
+                scores = vectors @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self._entries[user_id][best]
+                    entry["hits"] += 1
+                    entry["last_used"] = now
+                    self.hits += 1
+                    logger.debug(f"Semantic cache hit for user {user_id} (score: {scores[best]:.3f})")
+                    return entry["response"]
+
+        self.misses += 1
+        return None
+
+    def add(self, user_id: str, embedding: List[float], response: str) -> None:
+        """
+        Cache a response for a query embedding.
+
+        Args:
+            user_id (str): User identifier
+            embedding (List[float]): Embedding of the query
+            response (str): Response generated for the query
+        """
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        vectors = self._vectors.get(user_id)
+        entries = self._entries.setdefault(user_id, [])
+
+        if vectors is None or vectors.shape[1] != vector.shape[0]:
+            vectors = np.empty((0, vector.shape[0]), dtype=np.float32)
+            entries.clear()
+
+        if len(entries) >= self.max_entries:
+            # Drop the least recently used entry
+            lru = min(range(len(entries)), key=lambda i: entries[i]["last_used"])
+            vectors = np.delete(vectors, lru, axis=0)
+            del entries[lru]
+
+        self._vectors[user_id] = np.vstack([vectors, vector])
+        entries.append({"response": response, "ts": now, "last_used": now, "hits": 0})
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        """Clear cached responses for one user, or for everyone when user_id is None."""
+        if user_id is None:
+            self._vectors.clear()
+            self._entries.clear()
+        else:
+            self._vectors.pop(user_id, None)
+            self._entries.pop(user_id, None)
+
+    def _evict_expired(self, user_id: str, now: float) -> None:
+        entries = self._entries.get(user_id)
+        if not entries:
+            return
+        keep = [i for i, entry in enumerate(entries) if now - entry["ts"] < self.ttl_seconds]
+        if len(keep) == len(entries):
+            return
+        if keep:
+            self._vectors[user_id] = self._vectors[user_id][keep]
+            self._entries[user_id] = [entries[i] for i in keep]
+        else:
+            self.clear(user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the number of cached entries."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": sum(len(entries) for entries in self._entries.values())
+        }
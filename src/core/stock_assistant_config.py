@@ -59,6 +59,14 @@ Remember: Past performance doesn't guarantee future results. Always encourage us
                 "embedding_model": "text-embedding-ada-002"
             },
             
+            # Off until the rag_cache_hits_total/rag_cache_misses_total hit rate justifies it
+            "semantic_cache_settings": {
+                "enabled": False,
+                "similarity_threshold": 0.92,
+                "ttl_seconds": 300,
+                "max_entries_per_user": 1000
+            },
+            
             "response_templates": {
                 "greeting": "Hello! I'm your AI financial advisor. I'm here to help you with stock market analysis, trading strategies, and investment insights. What would you like to discuss today?",
                 "risk_disclaimer": "\n\n⚠️ **Important Disclaimer**: This is for educational purposes only. Past performance doesn't guarantee future results. Always do your own research and consider consulting with licensed financial advisors for personalized advice.",
@@ -113,6 +121,10 @@ Remember: Past performance doesn't guarantee future results. Always encourage us
         """Get OpenAI settings."""
         return self.config["openai_settings"]
     
+    def get_semantic_cache_settings(self) -> Dict[str, Any]:
+        """Get semantic response cache settings."""
+        return self.config.get("semantic_cache_settings", self._get_default_config()["semantic_cache_settings"])
+    
     def get_response_templates(self) -> Dict[str, str]:
         """Get response templates."""
         return self.config["response_templates"]
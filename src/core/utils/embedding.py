@@ -1,3 +1,4 @@
+import hashlib
 from openai import OpenAI
 from typing import List, Optional
 
@@ -10,6 +11,7 @@ def get_embeddings(
 ) -> List[List[float]]:
     """
     Get embeddings for a list of texts using OpenAI's Embedding API (v1.x+).
+    Duplicate texts (e.g. repeated PDF headers/footers) are embedded only once.
     Args:
         texts: List of input strings.
         model: OpenAI embedding model name.
@@ -18,11 +20,26 @@ def get_embeddings(
     Returns:
         List of embedding vectors (one per input text).
     """
+    unique_texts, index_map = _dedupe_texts(texts)
     client = OpenAI(api_key=api_key)
     embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
+    for i in range(0, len(unique_texts), batch_size):
+        batch = unique_texts[i:i+batch_size]
         response = client.embeddings.create(input=batch, model=model)
         batch_embeddings = [d.embedding for d in response.data]
         embeddings.extend(batch_embeddings)
-    return embeddings
+    return [embeddings[i] for i in index_map]
+
+
+def _dedupe_texts(texts: List[str]):
+    """Return the unique texts and, for each input text, the index of its unique copy."""
+    seen = {}
+    unique_texts = []
+    index_map = []
+    for text in texts:
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        if digest not in seen:
+            seen[digest] = len(unique_texts)
+            unique_texts.append(text)
+        index_map.append(seen[digest])
+    return unique_texts, index_map
@@ -1,3 +1,4 @@
+import io
 import os
 from typing import List
 
@@ -34,6 +35,21 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     except PdfReadError as e:
         raise ValueError(f"Failed to read PDF: {e}")
 
+def extract_text_from_pdf_bytes(data: bytes) -> str:
+    """
+    Extract all text from an in-memory PDF.
+    """
+    if PdfReader is None:
+        raise ImportError("PyPDF2 is required for PDF parsing. Please install it.")
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() or ""
+        return text.strip()
+    except PdfReadError as e:
+        raise ValueError(f"Failed to read PDF: {e}")
+
 def chunk_text(text: str, chunk_size: int) -> List[str]:
     """
     Split text into chunks of at most chunk_size, preserving word boundaries where possible.
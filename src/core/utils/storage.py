@@ -0,0 +1,74 @@
+import asyncio
+import os
+from pathlib import Path
+
+try:
+    import aioboto3
+except ImportError:
+    aioboto3 = None
+
+from core.logging.config import get_logger
+
+logger = get_logger("storage")
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
+
+
+def sanitize_filename(filename: str) -> str:
+    """
+    Strip directory components so a client-supplied name can't escape the upload location.
+
+    Args:
+        filename (str): File name as sent by the client
+
+    Returns:
+        str: The bare file name, or "upload" if nothing usable remains
+    """
+    name = Path((filename or "").replace("\\", "/")).name
+    return name if name not in ("", ".", "..") else "upload"
+
+
+async def save_upload(document_id: str, filename: str, data: bytes) -> str:
+    """
+    Persist raw upload bytes to the configured storage backend.
+
+    The backend is selected with STORAGE_BACKEND ("local" or "s3"). Local files go under
+    UPLOAD_DIR (default data/uploads) and are written in a worker thread so they don't
+    block the event loop; the s3 backend streams the bytes to S3/MinIO with aioboto3.
+
+    Args:
+        document_id (str): ID of the document the file belongs to
+        filename (str): Original file name
+        data (bytes): File contents
+
+    Returns:
+        str: Local path or s3:// URI of the stored object
+    """
+    backend = os.getenv("STORAGE_BACKEND", "local").lower()
+    if backend == "s3":
+        return await _save_to_s3(f"{document_id}/{filename}", data)
+    if backend != "local":
+        raise ValueError(f"Unsupported STORAGE_BACKEND: {backend}")
+
+    save_path = Path(UPLOAD_DIR, f"{document_id}_{filename}")
+    await asyncio.to_thread(_write_bytes, save_path, data)
+    return str(save_path)
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+async def _save_to_s3(key: str, data: bytes) -> str:
+    if aioboto3 is None:
+        raise ImportError("aioboto3 is required for STORAGE_BACKEND=s3. Please install it.")
+    bucket = os.getenv("S3_BUCKET")
+    if not bucket:
+        raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+
+    session = aioboto3.Session()
+    async with session.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL")) as s3:
+        await s3.put_object(Bucket=bucket, Key=key, Body=data)
+    logger.info(f"Stored upload in s3://{bucket}/{key}")
+    return f"s3://{bucket}/{key}"
@@ -26,6 +26,9 @@ DATABASE_URL = os.getenv(
     f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+# asyncpg takes a plain postgresql:// DSN, without the SQLAlchemy driver suffix
+ASYNCPG_DSN = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
 logger.info(f"Initializing database connection to {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
 
 engine = create_async_engine(
@@ -1,16 +1,35 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from datetime import datetime
 from features.models.pydantic.chat import ChatRequest, ChatResponse
 from features.services.chat_service import ChatService
+from features.services.rag_service import RAGService
 from database.pg_connection import get_async_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+async def get_rag_service(request: Request) -> RAGService:
+    """
+    Return the app-wide RAGService, creating it on first use if startup didn't.
+
+    Declared async so FastAPI resolves it on the event loop instead of a threadpool.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        RAGService: The shared RAG service.
+    """
+    rag_service = getattr(request.app.state, "rag_service", None)
+    if rag_service is None:
+        rag_service = request.app.state.rag_service = RAGService(qdrant_clients=getattr(request.app.state, "qdrant_clients", None))
+    return rag_service
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
     request: ChatRequest,
-    db_session: AsyncSession = Depends(get_async_session)
+    db_session: AsyncSession = Depends(get_async_session),
+    rag_service: RAGService = Depends(get_rag_service)
 ) -> ChatResponse:
     """
     Handle chat requests from the user and save the conversation to the database.
@@ -18,9 +37,10 @@ async def chat_endpoint(
     Args:
         request (ChatRequest): The user's chat message.
         db_session (AsyncSession): Database session dependency.
+        rag_service (RAGService): Shared RAG service dependency.
 
     Returns:
         ChatResponse: The bot's response with a timestamp and message ID.
     """
-    chat_service = ChatService(db_session)
+    chat_service = ChatService(db_session, rag_service)
     return await chat_service.process_chat_request(request)
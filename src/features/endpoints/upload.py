@@ -1,68 +1,117 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Query, Body
-from fastapi.responses import JSONResponse
-from features.models.pydantic.upload import PDFUploadMetadata, PDFUploadResponse
-from typing import Optional, List
-import shutil
+from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException, status, Query, Body
+from fastapi.responses import JSONResponse, Response
+from features.models.msgspec.upload import PDFUploadResponse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List
+import asyncio
 import os
 import uuid
 import logging
+import msgspec
 
-from core.utils.parser import extract_text_from_pdf, chunk_text
+from core.utils.parser import extract_text_from_pdf_bytes, chunk_text
+from core.utils.storage import save_upload, sanitize_filename, UPLOAD_DIR
 from core.utils.embedding import get_embeddings
 from core.qdrant_client import QdrantMemoryClient
 
 router = APIRouter()
 
-UPLOAD_DIR = "data/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 logger = logging.getLogger("upload_endpoint")
 
-@router.post("/upload", response_model=PDFUploadResponse)
+PDF_COLLECTION = "pdf_documents"
+PDF_MAGIC = b"%PDF-"
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+# Texts per embeddings request (the API accepts up to 2048 inputs per call)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+
+# Responses are msgspec Structs, encoded directly instead of going through Pydantic
+_json_encoder = msgspec.json.Encoder()
+_, _upload_schemas = msgspec.json.schema_components([PDFUploadResponse])
+UPLOAD_RESPONSE_DOC = {200: {"content": {"application/json": {"schema": _upload_schemas["PDFUploadResponse"]}}}}
+
+
+@asynccontextmanager
+async def get_qdrant_client(request: Request, collection_name: str) -> AsyncIterator[QdrantMemoryClient]:
+    """
+    Yield a Qdrant client for a collection.
+
+    The clients created at startup (app.state.qdrant_clients) are shared across requests.
+    Any other collection name comes from the caller, so it gets a client of its own that
+    is closed when the request is done instead of being cached on the app.
+    """
+    qdrant_client = getattr(request.app.state, "qdrant_clients", {}).get(collection_name)
+    if qdrant_client is not None:
+        yield qdrant_client
+        return
+    qdrant_client = QdrantMemoryClient(collection_name=collection_name, qdrant_url=os.getenv("QDRANT_URL", "http://localhost:6333"))
+    try:
+        await qdrant_client.connect()
+        if collection_name == PDF_COLLECTION:
+            await qdrant_client.create_collection()
+        yield qdrant_client
+    finally:
+        await qdrant_client.close()
+
+@router.post("/upload", response_class=Response, responses=UPLOAD_RESPONSE_DOC)
 async def upload_pdf(
+    request: Request,
     file: UploadFile = File(...),
     title: str = Form(...),
     description: Optional[str] = Form(None),
     tags: Optional[str] = Form(None)  # comma-separated tags
 ):
-    # Validate file type
+    # Validate file type; Content-Type is client-supplied, so also check the PDF magic bytes
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed.")
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large.")
+    header = await file.read(len(PDF_MAGIC))
+    if header != PDF_MAGIC:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not a valid PDF.")
+    await file.seek(0)
+
+    # Starlette has already spooled the whole body to a temp file by now; reading at most one
+    # byte past the limit only bounds the copy into memory. Capping what the server receives
+    # at all is left to the proxy's body-size limit.
+    pdf_bytes = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(pdf_bytes) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large.")
 
     # Parse tags
     tag_list = [t.strip() for t in tags.split(",")] if tags else []
 
-    # Save file to disk (or cloud, etc.)
-    document_id = str(uuid.uuid4())
-    save_path = os.path.join(UPLOAD_DIR, f"{document_id}_{file.filename}")
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    document_id = uuid.uuid4().hex
+    filename = sanitize_filename(file.filename)
 
     try:
-        # 1. Extract text
-        text = extract_text_from_pdf(save_path)
+        # 1. Store the raw PDF (local disk or object storage) while extracting text
+        _, text = await asyncio.gather(
+            save_upload(document_id, filename, pdf_bytes),
+            asyncio.to_thread(extract_text_from_pdf_bytes, pdf_bytes)
+        )
         if not text:
             raise ValueError("No text could be extracted from the PDF.")
-        # 2. Chunk text
-        chunks = chunk_text(text, chunk_size=1000)
+        # 2. Chunk text (CPU-bound, so off the event loop)
+        chunks = await asyncio.to_thread(chunk_text, text, chunk_size=1000)
         if not chunks:
             raise ValueError("No chunks generated from PDF text.")
-        # 3. Get embeddings
-        embeddings = get_embeddings(
+        # 3. Get embeddings; the sync OpenAI client runs in a worker thread, EMBEDDING_BATCH_SIZE chunks per request
+        embeddings = await asyncio.to_thread(
+            get_embeddings,
             chunks,
             model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=os.getenv("OPENAI_API_KEY"),
+            batch_size=EMBEDDING_BATCH_SIZE
         )
         if len(embeddings) != len(chunks):
             raise ValueError("Mismatch between number of chunks and embeddings.")
         # 4. Store in Qdrant
-        qdrant_client = QdrantMemoryClient.for_pdfs(qdrant_url=os.getenv("QDRANT_URL", "http://localhost:6333"))
-        await qdrant_client.connect()
-        await qdrant_client.create_collection()
-        for chunk, embedding in zip(chunks, embeddings):
-            await qdrant_client.store_memory_item(
-                content=chunk,
-                embedding=embedding,
+        async with get_qdrant_client(request, PDF_COLLECTION) as qdrant_client:
+            await qdrant_client.store_memory_items(
+                contents=chunks,
+                embeddings=embeddings,
                 user_id="pdf_upload",  # Replace with real user ID if available
                 memory_type="pdf_chunk",
                 metadata={
@@ -70,31 +119,33 @@ async def upload_pdf(
                     "description": description,
                     "tags": tag_list,
                     "document_id": document_id,
-                    "filename": file.filename
+                    "filename": filename
                 }
             )
-        logger.info(f"PDF {file.filename} processed and stored in Qdrant.")
+        logger.info(f"PDF {filename} processed and stored in Qdrant.")
     except Exception as e:
         logger.error(f"Error processing PDF: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {e}")
 
-    return PDFUploadResponse(
-        filename=file.filename,
-        status="success",
-        message="File uploaded and processed successfully.",
-        document_id=document_id
+    return Response(
+        content=_json_encoder.encode(PDFUploadResponse(
+            filename=filename,
+            status="success",
+            message="File uploaded and processed successfully.",
+            document_id=document_id
+        )),
+        media_type="application/json"
     )
 
 @router.get("/qdrant/documents")
-async def get_all_documents_id(collection_name: str = Query(..., description="Qdrant collection name")):
+async def get_all_documents_id(request: Request, collection_name: str = Query(..., description="Qdrant collection name")):
     """
     Get all document IDs from a Qdrant collection.
     """
     try:
-        qdrant_client = QdrantMemoryClient(collection_name=collection_name, qdrant_url=os.getenv("QDRANT_URL", "http://localhost:6333"))
-        await qdrant_client.connect()
-        # Assume document_id is stored in payload["metadata"]["document_id"]
-        points = await qdrant_client.get_all_points()
+        async with get_qdrant_client(request, collection_name) as qdrant_client:
+            # Assume document_id is stored in payload["metadata"]["document_id"]
+            points = await qdrant_client.get_all_points()
         document_ids = set()
         for point in points:
             doc_id = point.payload.get("metadata", {}).get("document_id")
@@ -107,6 +158,7 @@ async def get_all_documents_id(collection_name: str = Query(..., description="Qd
 
 @router.delete("/qdrant/documents")
 async def clean_all_documents_id_array(
+    request: Request,
     collection_name: str = Body(..., embed=True, description="Qdrant collection name"),
     document_ids: List[str] = Body(..., embed=True, description="Array of document IDs to delete")
 ):
@@ -114,17 +166,9 @@ async def clean_all_documents_id_array(
     Delete all documents in Qdrant with the given document_ids from the specified collection.
     """
     try:
-        qdrant_client = QdrantMemoryClient(collection_name=collection_name, qdrant_url=os.getenv("QDRANT_URL", "http://localhost:6333"))
-        await qdrant_client.connect()
-        # Find all point IDs for the given document_ids
-        points = await qdrant_client.get_all_points()
-        to_delete = []
-        for point in points:
-            doc_id = point.payload.get("metadata", {}).get("document_id")
-            if doc_id in document_ids:
-                to_delete.append(point.id)
-        if to_delete:
-            await qdrant_client.delete_points(to_delete)
+        async with get_qdrant_client(request, collection_name) as qdrant_client:
+            # Filter and delete server-side on the indexed metadata.document_id field
+            to_delete = await qdrant_client.delete_points_by_document_ids(document_ids)
         return {"deleted_point_ids": to_delete, "count": len(to_delete)}
     except Exception as e:
         logger.error(f"Error deleting documents from Qdrant: {e}")
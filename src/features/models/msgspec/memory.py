@@ -0,0 +1,114 @@
+import time
+import msgspec
+import msgpack
+import orjson
+from typing import Dict, Any
+from datetime import datetime, timezone
+
+_json_encoder = msgspec.json.Encoder()
+
+
+# Structs holding only scalars can't form reference cycles, so they opt out of GC tracking (gc=False)
+class ConversationTurn(msgspec.Struct, frozen=True, gc=False):
+    """A single conversation turn stored in Redis."""
+    user_message: str
+    assistant_response: str
+    # UTC epoch nanoseconds; converted to a datetime only when rendered
+    timestamp_ns: int = msgspec.field(default_factory=time.time_ns)
+
+    @property
+    def timestamp(self) -> datetime:
+        """When this turn occurred, as a naive UTC datetime."""
+        return datetime.fromtimestamp(self.timestamp_ns / 1e9, tz=timezone.utc).replace(tzinfo=None)
+
+    def to_json(self) -> str:
+        """Convert to JSON string for Redis storage."""
+        return _json_encoder.encode(self).decode()
+
+    @classmethod
+    def from_json(cls, json_str: str) -> "ConversationTurn":
+        """Create from JSON string from Redis."""
+        return _turn_decoder.decode(json_str)
+
+    def to_msgpack(self) -> bytes:
+        """Convert to a compact msgpack payload (short keys, epoch-nanosecond timestamp)."""
+        return msgpack.packb({
+            "u": self.user_message,
+            "a": self.assistant_response,
+            "t": self.timestamp_ns
+        })
+
+    @classmethod
+    def from_msgpack(cls, data: bytes) -> "ConversationTurn":
+        """Create from a msgpack payload produced by to_msgpack."""
+        payload = msgpack.unpackb(data, raw=False)
+        return cls(
+            user_message=payload["u"],
+            assistant_response=payload["a"],
+            timestamp_ns=payload["t"]
+        )
+
+
+_turn_decoder = msgspec.json.Decoder(ConversationTurn)
+
+
+class UserSession(msgspec.Struct):
+    """User session data stored in Redis."""
+    user_id: str
+    preferences: Dict[str, Any] = msgspec.field(default_factory=dict)
+    metadata: Dict[str, Any] = msgspec.field(default_factory=dict)
+    last_activity: datetime = msgspec.field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def from_data(cls, user_id: str, data: Dict[str, Any]) -> "UserSession":
+        """Build a session from caller-supplied fields; unknown keys are ignored."""
+        return msgspec.convert({**data, "user_id": user_id}, cls)
+
+    def to_redis_dict(self) -> Dict[str, str]:
+        """Convert to dictionary for Redis hash storage."""
+        return {
+            "preferences": orjson.dumps(self.preferences).decode(),
+            "metadata": orjson.dumps(self.metadata).decode(),
+            "last_activity": self.last_activity.isoformat()
+        }
+
+    @classmethod
+    def from_redis_dict(cls, user_id: str, redis_data: Dict[str, str]) -> "UserSession":
+        """Create from Redis hash data."""
+        preferences = {}
+        metadata = {}
+        last_activity = None
+
+        if "preferences" in redis_data:
+            try:
+                preferences = orjson.loads(redis_data["preferences"])
+            except (orjson.JSONDecodeError, TypeError):
+                preferences = {}
+
+        if "metadata" in redis_data:
+            try:
+                metadata = orjson.loads(redis_data["metadata"])
+            except (orjson.JSONDecodeError, TypeError):
+                metadata = {}
+
+        if "last_activity" in redis_data:
+            try:
+                last_activity = datetime.fromisoformat(redis_data["last_activity"])
+            except (ValueError, TypeError):
+                pass
+
+        return cls(
+            user_id=user_id,
+            preferences=preferences,
+            metadata=metadata,
+            # Only fall back to "now" when the stored value is missing or unparsable
+            last_activity=last_activity or datetime.utcnow()
+        )
+
+
+class MemoryStats(msgspec.Struct, gc=False):
+    """Redis memory statistics."""
+    active_conversations: int
+    active_sessions: int
+    memory_usage: str
+    ttl_hours: int
@@ -0,0 +1,13 @@
+import msgspec
+from typing import Optional
+
+class PDFUploadMetadata(msgspec.Struct):
+    title: str
+    description: Optional[str] = None
+    tags: list[str] = msgspec.field(default_factory=list)
+
+class PDFUploadResponse(msgspec.Struct):
+    filename: str
+    status: str
+    message: Optional[str] = None
+    document_id: Optional[str] = None
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, insert, update, delete
 from datetime import datetime
 from features.models.sqlalchemy.chat import ChatMessage
 from features.models.pydantic.chat import ChatRequest, ChatResponse
@@ -12,9 +12,10 @@ logger = get_logger("chat_service")
 class ChatService:
     """Service class for chat message CRUD operations."""
     
-    def __init__(self, db_session: AsyncSession):
+    def __init__(self, db_session: AsyncSession, rag_service: Optional[RAGService] = None):
         self.db = db_session
-        self.rag_service = RAGService()
+        # The app-wide RAGService is injected per request; building one is the standalone fallback
+        self.rag_service = rag_service or RAGService()
     
     async def create_chat_message(self, user_message: str, bot_response: str, metadata: Optional[dict] = None) -> ChatMessage:
         """
@@ -29,15 +30,26 @@ class ChatService:
             ChatMessage: The created chat message
         """
         try:
+            # RETURNING fetches the server-generated columns, so no refresh SELECT is needed
+            result = await self.db.execute(
+                insert(ChatMessage)
+                .values(
+                    user_message=user_message,
+                    bot_response=bot_response,
+                    message_metadata=metadata
+                )
+                .returning(ChatMessage.id, ChatMessage.timestamp)
+            )
+            row = result.one()
+            await self.db.commit()
+
             chat_message = ChatMessage(
+                id=row.id,
+                timestamp=row.timestamp,
                 user_message=user_message,
                 bot_response=bot_response,
                 message_metadata=metadata
             )
-            self.db.add(chat_message)
-            await self.db.commit()
-            await self.db.refresh(chat_message)
-            
             logger.info(f"Created chat message with ID: {chat_message.id}")
             return chat_message
         except Exception as e:
@@ -45,6 +57,34 @@ class ChatService:
             logger.error(f"Error creating chat message: {e}")
             raise
     
+    async def create_chat_messages_bulk(self, items: List[dict], batch_size: int = 500) -> List[int]:
+        """
+        Insert many chat messages with one executemany round-trip per batch and a single commit.
+
+        Args:
+            items (List[dict]): Rows with user_message, bot_response and optional message_metadata
+            batch_size (int): Number of rows sent per INSERT statement
+
+        Returns:
+            List[int]: The IDs of the created chat messages, in input order
+        """
+        if not items:
+            return []
+        try:
+            stmt = insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True)
+            message_ids = []
+            for i in range(0, len(items), batch_size):
+                result = await self.db.execute(stmt, items[i:i + batch_size])
+                message_ids.extend(result.scalars().all())
+            await self.db.commit()
+
+            logger.info(f"Bulk-created {len(message_ids)} chat messages")
+            return message_ids
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk-creating chat messages: {e}")
+            raise
+
     async def get_chat_message(self, message_id: int) -> Optional[ChatMessage]:
         """
         Retrieve a specific chat message by ID.
@@ -125,16 +165,19 @@ class ChatService:
                 logger.warning("No update data provided")
                 return None
             
+            # RETURNING hands back the updated row, so no follow-up SELECT is needed
             result = await self.db.execute(
                 update(ChatMessage)
                 .where(ChatMessage.id == message_id)
                 .values(**update_data)
+                .returning(ChatMessage)
             )
-            
-            if result.rowcount > 0:
+            chat_message = result.scalar_one_or_none()
+
+            if chat_message:
                 await self.db.commit()
                 logger.info(f"Updated chat message with ID: {message_id}")
-                return await self.get_chat_message(message_id)
+                return chat_message
             else:
                 logger.warning(f"Chat message with ID {message_id} not found for update")
                 return None
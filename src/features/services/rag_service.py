@@ -1,20 +1,66 @@
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import sys
+import time
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime
 from core.openai_client import OpenAIClient
-from core.hybrid_memory_manager import HybridMemoryManager
+from core.batching_embedding_client import BatchingEmbeddingClient
+from core.hybrid_memory_manager import HybridMemoryManager, MemoryContext
+from core.qdrant_client import QdrantMemoryClient
 from core.stock_assistant_config import StockAssistantConfig
+from core.semantic_cache import SemanticResponseCache
+from core.metrics import CACHE_HITS, CACHE_MISSES, STAGE_SECONDS, REQUEST_SECONDS
 from core.logging.config import get_logger
 
 logger = get_logger("rag_service")
 
+# Matches any of the stock keywords as a substring (so "stocks" matches "stock"), case-insensitively
+_STOCK_KEYWORDS_RE = re.compile(r"stock|trading|investment|portfolio|analysis|strategy", re.IGNORECASE)
+
+# Shared bucket for callers that don't send a user_id
+DEFAULT_USER_ID = "default_user"
+
+# Strong references to in-flight background writes so they aren't garbage collected mid-run
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def drain_background_tasks() -> None:
+    """Wait for all in-flight background memory writes to finish."""
+    while _background_tasks:
+        await asyncio.gather(*list(_background_tasks), return_exceptions=True)
+
 class RAGService:
     """RAG (Retrieval-Augmented Generation) service for stock assistant."""
     
-    def __init__(self):
-        self.openai_client = OpenAIClient()
-        self.hybrid_memory = HybridMemoryManager()
+    def __init__(self, qdrant_clients: Optional[Dict[str, QdrantMemoryClient]] = None):
+        """
+        Args:
+            qdrant_clients (Optional[Dict[str, QdrantMemoryClient]]): Connected clients keyed by
+                collection name (app.state.qdrant_clients) to reuse instead of opening new ones
+        """
+        qdrant_clients = qdrant_clients or {}
+        # Embedding calls from the cache and memory layers share one micro-batcher
+        self.openai_client = BatchingEmbeddingClient(OpenAIClient())
+        self.hybrid_memory = HybridMemoryManager(
+            openai_client=self.openai_client,
+            qdrant_memory=qdrant_clients.get("conversations"),
+            pdf_memory=qdrant_clients.get("pdf_documents")
+        )
         self.config = StockAssistantConfig()
+        # Settings read on every request are resolved once here; the system prompt is
+        # interned and reused as-is whenever there is no memory context
+        self._system_prompt = sys.intern(self.config.get_system_prompt())
+        self._openai_settings = self.config.get_openai_settings()
+        self._function_definitions = self.config.get_function_definitions()
+        
+        cache_settings = self.config.get_semantic_cache_settings()
+        self.response_cache = SemanticResponseCache(
+            threshold=cache_settings["similarity_threshold"],
+            ttl_seconds=cache_settings["ttl_seconds"],
+            max_entries=cache_settings["max_entries_per_user"]
+        ) if cache_settings.get("enabled") else None
         
         logger.info("RAG service initialized")
     
@@ -29,61 +75,128 @@ class RAGService:
         Returns:
             str: The generated response
         """
+        started = time.perf_counter()
         try:
             # Use default user_id if not provided
-            user_id = user_id or "default_user"
+            user_id = user_id or DEFAULT_USER_ID
             
-            # Get combined context from both short-term and long-term memory
-            context_data = await self.hybrid_memory.get_context_for_user(user_id=user_id, current_user_message=user_message)
+            # The cache embedding and the memory context are independent, so fetch them together
+            with STAGE_SECONDS.labels(stage="context").time():
+                query_embedding, context = await asyncio.gather(
+                    self._embed_for_cache(user_message, user_id),
+                    self.hybrid_memory.get_context_for_user(user_id=user_id, current_user_message=user_message)
+                )
+            # A cached answer ignores the conversation, so it is only used when there is none:
+            # follow-ups like "tell me more" depend on the recent turns
+            if context.short_term_context:
+                query_embedding = None
+            response = self._lookup_cached_response(user_id, query_embedding)
+            cache_result = "hit" if response is not None else "miss"
             
-            # Build messages for OpenAI with combined context
-            messages = self._build_messages(user_message, context_data)
+            if response is None:
+                # Build messages for OpenAI with combined context
+                with STAGE_SECONDS.labels(stage="build_messages").time():
+                    messages = self._build_messages(user_message, context)
+                
+                # Generate response
+                with STAGE_SECONDS.labels(stage="openai").time():
+                    response = await self.openai_client.get_chat_completion(
+                        messages=messages,
+                        temperature=self._openai_settings["temperature"],
+                        max_tokens=self._openai_settings["max_tokens"]
+                    )
+                self._cache_response(user_id, query_embedding, response)
+            REQUEST_SECONDS.labels(cache=cache_result).observe(time.perf_counter() - started)
             
-            # Get OpenAI settings
-            openai_settings = self.config.get_openai_settings()
-            
-            # Generate response
-            response = await self.openai_client.get_chat_completion(
-                messages=messages,
-                temperature=openai_settings["temperature"],
-                max_tokens=openai_settings["max_tokens"]
-            )
-            
-            # Add conversation turn to both memory systems (with automatic importance detection)
-            memory_result = await self.hybrid_memory.add_conversation_turn(
-                user_id, user_message, response
-            )
-            
-            logger.info(f"Generated response for user {user_id}: {user_message[:50]}...")
-            if memory_result.get("long_term_stored"):
-                logger.info(f"Stored important memory: {memory_result.get('memory_type')} (score: {memory_result.get('importance_score'):.2f})")
+            # Persist the turn in the background; the reply doesn't depend on the write
+            self._schedule_persist_turn(user_id, user_message, response)
             
+            logger.info("Generated response for user %s: %.50s...", user_id, user_message)
             return response
             
         except Exception as e:
-            logger.error(f"Error processing user message: {e}")
+            logger.error("Error processing user message: %s", e)
             return "I apologize, but I encountered an error processing your request. Please try again."
     
-    def _build_messages(self, user_message: str, context_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    def _schedule_persist_turn(self, user_id: str, user_message: str, response: str) -> None:
+        """Run _persist_turn as a tracked background task."""
+        task = asyncio.create_task(self._persist_turn(user_id, user_message, response))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    async def _persist_turn(self, user_id: str, user_message: str, response: str) -> None:
+        """Add a conversation turn to both memory systems (with automatic importance detection)."""
+        try:
+            with STAGE_SECONDS.labels(stage="memory_write").time():
+                memory_result = await self.hybrid_memory.add_conversation_turn(
+                    user_id, user_message, response
+                )
+            if memory_result.get("long_term_stored") and logger.isEnabledFor(logging.INFO):
+                logger.info("Stored important memory: %s (score: %.2f)", memory_result.get("memory_type"), memory_result.get("importance_score"))
+        except Exception as e:
+            logger.error("Error storing conversation turn for user %s: %s", user_id, e)
+    
+    async def _embed_for_cache(self, user_message: str, user_id: str) -> Optional[List[float]]:
+        """
+        Embed the user message for the semantic cache.
+
+        Returns None (no lookup, no insert) when the cache is disabled, the caller is
+        anonymous (every anonymous request shares DEFAULT_USER_ID) or embedding fails.
+        """
+        if self.response_cache is None or user_id == DEFAULT_USER_ID:
+            return None
+        try:
+            with STAGE_SECONDS.labels(stage="embedding").time():
+                return (await self.openai_client.get_embeddings([user_message]))[0]
+        except Exception as e:
+            logger.warning("Semantic cache embedding failed, skipping cache: %s", e)
+            return None
+    
+    def _lookup_cached_response(self, user_id: str, query_embedding: Optional[List[float]]) -> Optional[str]:
+        """Return a cached response for a semantically similar previous query, if any."""
+        if query_embedding is None:
+            return None
+        try:
+            response = self.response_cache.lookup(user_id, query_embedding)
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            return None
+        if response is not None:
+            CACHE_HITS.labels(kind="semantic").inc()
+            logger.info("Semantic cache hit for user %s", user_id)
+        else:
+            CACHE_MISSES.labels(kind="semantic").inc()
+        return response
+    
+    def _cache_response(self, user_id: str, query_embedding: Optional[List[float]], response: str) -> None:
+        """Store a freshly generated response in the semantic cache."""
+        if query_embedding is None:
+            return
+        try:
+            self.response_cache.add(user_id, query_embedding, response)
+        except Exception as e:
+            logger.warning("Semantic cache insert failed: %s", e)
+    
+    def _build_messages(self, user_message: str, context: MemoryContext) -> List[Dict[str, str]]:
         """Build messages for OpenAI API with hybrid memory context."""
-        messages = []
-        # System prompt
-        system_prompt = self.config.get_system_prompt()
-        # Combine all context types
-        context_parts = []
-        if context_data.get("short_term_context"):
-            context_parts.append("=== RECENT CONVERSATION ===")
-            context_parts.append(context_data["short_term_context"])
-        if context_data.get("long_term_context"):
-            context_parts.append(context_data["long_term_context"])
-        if context_data.get("pdf_context"):
-            context_parts.append(context_data["pdf_context"])
-        if context_parts:
-            system_prompt += f"\n\nMemory Context:\n{chr(10).join(context_parts)}"
-        messages.append({"role": "system", "content": system_prompt})
-        # User message
-        messages.append({"role": "user", "content": user_message})
-        return messages
+        if context.is_empty:
+            # Fast path for cold users: no string building at all
+            return [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": user_message}
+            ]
+        # System prompt fragments are joined once instead of concatenated step by step
+        parts = [self._system_prompt, "\n\nMemory Context:"]
+        if context.short_term_context:
+            parts.extend(("\n=== RECENT CONVERSATION ===\n", context.short_term_context))
+        if context.long_term_context:
+            parts.extend(("\n", context.long_term_context))
+        if context.pdf_context:
+            parts.extend(("\n", context.pdf_context))
+        return [
+            {"role": "system", "content": "".join(parts)},
+            {"role": "user", "content": user_message}
+        ]
     
     def _should_add_to_long_term(self, user_message: str, response: str) -> bool:
         """Determine if this exchange should be added to long-term memory."""
@@ -91,11 +204,7 @@ class RAGService:
         # 1. User asked about specific stocks
         # 2. Response contains analysis or advice
         # 3. User asked about trading strategies
-        
-        stock_keywords = ["stock", "trading", "investment", "portfolio", "analysis", "strategy"]
-        user_lower = user_message.lower()
-        
-        return any(keyword in user_lower for keyword in stock_keywords)
+        return _STOCK_KEYWORDS_RE.search(user_message) is not None
     
     async def process_with_functions(self, user_message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -109,37 +218,30 @@ class RAGService:
             Dict[str, Any]: Response with potential function calls
         """
         try:
-            # Add user message to short-term memory
-            self.memory_manager.add_to_short_term(f"User: {user_message}")
+            user_id = user_id or DEFAULT_USER_ID
             
             # Get context from memory
-            memory_context = self.memory_manager.get_combined_context()
+            context = await self.hybrid_memory.get_context_for_user(user_id=user_id, current_user_message=user_message)
             
             # Build messages
-            messages = self._build_messages(user_message, memory_context)
-            
-            # Get function definitions
-            functions = self.config.get_function_definitions()
-            
-            # Get OpenAI settings
-            openai_settings = self.config.get_openai_settings()
+            messages = self._build_messages(user_message, context)
             
             # Generate response with function calling
             result = await self.openai_client.get_chat_completion_with_functions(
                 messages=messages,
-                functions=functions,
-                temperature=openai_settings["temperature"]
+                functions=self._function_definitions,
+                temperature=self._openai_settings["temperature"]
             )
             
-            # Add bot response to short-term memory
+            # Record the turn in memory in the background, as process_user_message does
             response_content = result["content"] or "I'll help you with that."
-            self.memory_manager.add_to_short_term(f"Assistant: {response_content}")
+            self._schedule_persist_turn(user_id, user_message, response_content)
             
-            logger.info(f"Generated response with functions for: {user_message[:50]}...")
+            logger.info("Generated response with functions for: %.50s...", user_message)
             return result
             
         except Exception as e:
-            logger.error(f"Error processing user message with functions: {e}")
+            logger.error("Error processing user message with functions: %s", e)
             return {
                 "content": "I apologize, but I encountered an error processing your request. Please try again.",
                 "function_call": None
@@ -151,8 +253,10 @@ class RAGService:
     
     async def clear_user_memory(self, user_id: str) -> None:
         """Clear memory for a specific user."""
+        if self.response_cache is not None:
+            self.response_cache.clear(user_id)
         result = await self.hybrid_memory.clear_user_memory(user_id)
-        logger.info(f"Cleared memory for user {user_id}: {result}")
+        logger.info("Cleared memory for user %s: %s", user_id, result)
     
     async def search_memories(self, query: str, user_id: str = None, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for memories using semantic similarity."""
@@ -160,4 +264,13 @@ class RAGService:
     
     async def update_user_session(self, user_id: str, data: Dict[str, Any]) -> None:
         """Update user session data."""
-        await self.hybrid_memory.redis_memory.update_user_session(user_id, data) 
\ No newline at end of file
+        await self.hybrid_memory.redis_memory.update_user_session(user_id, data)
+    
+    async def close(self) -> None:
+        """Wait for pending memory writes, then release the memory connections and the OpenAI client."""
+        await drain_background_tasks()
+        try:
+            await self.hybrid_memory.close()
+        finally:
+            await self.openai_client.close()
+ 
\ No newline at end of file
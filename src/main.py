@@ -1,13 +1,17 @@
 import os
 import asyncio
-from fastapi import FastAPI
+import asyncpg
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from features.endpoints.chat import router as chat_router
 from features.endpoints.upload import router as upload_router
-from database.pg_connection import engine
+from features.services.rag_service import RAGService, drain_background_tasks
+from core.metrics import log_cache_stats_periodically
+from prometheus_client import make_asgi_app
+from database.pg_connection import engine, ASYNCPG_DSN
 from database.redis_connection import get_redis_client
-from sqlalchemy import text, inspect
 from features.models.sqlalchemy.chat import Base
 import logging
 
@@ -18,27 +22,26 @@ logger = logging.getLogger("startup")
 FASTAPI_HOST = os.getenv("FASTAPI_HOST", "0.0.0.0")
 FASTAPI_PORT = int(os.getenv("FASTAPI_PORT", "8000"))
 
-async def check_database_connection():
+async def check_database_connection(app):
     """Check PostgreSQL connection and create tables if needed. Create the database if it does not exist (for local dev)."""
-    from sqlalchemy.ext.asyncio import create_async_engine
     try:
-        # Test database connection
-        async with engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
+        # Probe with a bare asyncpg pool; it is kept on app.state for /healthz
+        pool = await asyncpg.create_pool(ASYNCPG_DSN, min_size=1, max_size=1, timeout=5)
+        try:
+            async with pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+        except Exception:
+            await pool.close()
+            raise
+        app.state.pg_pool = pool
         logger.info("✅ Database connection validated successfully")
         
-        # Check if tables exist
-        async with engine.begin() as conn:
-            def check_tables(sync_conn):
-                inspector = inspect(sync_conn)
-                return inspector.get_table_names()
-            existing_tables = await conn.run_sync(check_tables)
-            if "chat_messages" in existing_tables:
-                logger.info("✅ Database tables already exist")
-            else:
-                # Create tables if they don't exist
-                await conn.run_sync(Base.metadata.create_all)
-                logger.info("✅ Database tables created successfully")
+        # Runtime DDL is opt-out; deployments that manage the schema separately set RUN_MIGRATIONS=false
+        if os.getenv("RUN_MIGRATIONS", "true").lower() in ("1", "true", "yes"):
+            async with engine.begin() as conn:
+                # checkfirst only creates tables that are missing
+                await conn.run_sync(Base.metadata.create_all, checkfirst=True)
+            logger.info("✅ Database tables ensured")
         return True
     except Exception as e:
         # If the error is 'database ... does not exist' and we're on localhost, try to create it
@@ -49,9 +52,8 @@ async def check_database_connection():
         POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
         POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
         if ("does not exist" in err_msg and POSTGRES_HOST in ["localhost", "127.0.0.1"]) or ("does not exist" in err_msg and POSTGRES_HOST == "0.0.0.0"):
-            logger.warning(f"Database {POSTGRES_DB} does not exist. Attempting to create it...")
+            logger.warning("Database %s does not exist. Attempting to create it...", POSTGRES_DB)
             try:
-                import asyncpg
                 conn = await asyncpg.connect(
                     user=POSTGRES_USER,
                     password=POSTGRES_PASSWORD,
@@ -61,13 +63,13 @@ async def check_database_connection():
                 )
                 await conn.execute(f'CREATE DATABASE "{POSTGRES_DB}"')
                 await conn.close()
-                logger.info(f"✅ Database {POSTGRES_DB} created successfully.")
+                logger.info("✅ Database %s created successfully.", POSTGRES_DB)
             except Exception as ce:
-                logger.error(f"❌ Failed to create database {POSTGRES_DB}: {ce}")
+                logger.error("❌ Failed to create database %s: %s", POSTGRES_DB, ce)
                 return False
             # Try again to connect to the new database
-            return await check_database_connection()
-        logger.error(f"❌ Database connection failed: {e}")
+            return await check_database_connection(app)
+        logger.error("❌ Database connection failed: %s", e)
         return False
 
 async def check_redis_connection():
@@ -79,59 +81,91 @@ async def check_redis_connection():
         logger.info("✅ Redis connection validated successfully")
         return True
     except Exception as e:
-        logger.error(f"❌ Redis connection failed: {e}")
+        logger.error("❌ Redis connection failed: %s", e)
         return False
 
-async def check_qdrant_connection():
-    """Check Qdrant connection and create collection if needed."""
+async def check_qdrant_connection(app):
+    """Check Qdrant connection, create collections if needed and keep the clients on app.state for reuse."""
     try:
         from core.qdrant_client import QdrantMemoryClient
         
         # Initialize both Qdrant collections
         pdf_qdrant = QdrantMemoryClient.for_pdfs()
         convo_qdrant = QdrantMemoryClient.for_conversations()
-        await pdf_qdrant.connect()
-        await pdf_qdrant.create_collection()
-        await convo_qdrant.connect()
-        await convo_qdrant.create_collection()
+        async def prepare(qdrant_client):
+            await qdrant_client.connect()
+            await qdrant_client.create_collection()
+        # Kept on app.state before connecting, so a failed startup can still close them
+        app.state.qdrant_clients = {
+            pdf_qdrant.collection_name: pdf_qdrant,
+            convo_qdrant.collection_name: convo_qdrant
+        }
+        await asyncio.gather(prepare(pdf_qdrant), prepare(convo_qdrant))
         logger.info("✅ Qdrant collections validated and ready (pdf_documents, conversations)")
         return True
     except Exception as e:
-        logger.error(f"❌ Qdrant connection failed: {e}")
+        logger.error("❌ Qdrant connection failed: %s", e)
         return False
 
-async def initialize_services():
+async def initialize_services(app):
     """Initialize all required services."""
     logger.info("🚀 Initializing services...")
     
-    # Check database connection
-    db_ok = await check_database_connection()
-    if not db_ok:
-        raise Exception("Database connection failed")
-    
-    # Check Redis connection
-    redis_ok = await check_redis_connection()
-    if not redis_ok:
-        raise Exception("Redis connection failed")
-    
-    # Check Qdrant connection
-    qdrant_ok = await check_qdrant_connection()
-    if not qdrant_ok:
-        raise Exception("Qdrant connection failed")
+    # The dependency checks are independent network probes, so run them concurrently
+    checks = {
+        "Database": check_database_connection(app),
+        "Redis": check_redis_connection(),
+        "Qdrant": check_qdrant_connection(app)
+    }
+    results = await asyncio.gather(*checks.values(), return_exceptions=True)
+    failed = [
+        name if result is False else f"{name} ({result})"
+        for name, result in zip(checks, results)
+        if result is not True
+    ]
+    if failed:
+        raise Exception(f"Service checks failed: {', '.join(failed)}")
     
     logger.info("✅ All services initialized successfully")
 
+async def close_clients(app):
+    """Close the startup Qdrant clients and asyncpg pool, whichever were created."""
+    for qdrant_client in getattr(app.state, "qdrant_clients", {}).values():
+        await qdrant_client.close()
+    app.state.qdrant_clients = {}
+    pg_pool = getattr(app.state, "pg_pool", None)
+    if pg_pool is not None:
+        await pg_pool.close()
+        app.state.pg_pool = None
+
 @asynccontextmanager
 async def lifespan(app):
     """Lifespan context for FastAPI startup and shutdown events."""
     # Startup logic
     try:
-        await initialize_services()
+        await initialize_services(app)
+        # Clients inside RAGService (OpenAI HTTP pool, Redis, Qdrant) are reused across requests
+        app.state.rag_service = RAGService(qdrant_clients=getattr(app.state, "qdrant_clients", None))
     except Exception as e:
-        logger.error(f"❌ Service initialization failed: {e}")
+        logger.error("❌ Service initialization failed: %s", e)
+        # The checks that did succeed may have opened a pool or clients; don't leak them
+        await close_clients(app)
         raise
+    cache_stats_task = None
+    if app.state.rag_service.response_cache is not None:
+        cache_stats_task = asyncio.create_task(log_cache_stats_periodically(app.state.rag_service.response_cache))
     yield
-    # (Optional) Shutdown logic here
+    # Shutdown logic
+    if cache_stats_task is not None:
+        cache_stats_task.cancel()
+        # Let the cancellation finish before the clients it reports on are closed
+        with suppress(asyncio.CancelledError):
+            await cache_stats_task
+    await drain_background_tasks()
+    rag_service = getattr(app.state, "rag_service", None)
+    if rag_service is not None:
+        await rag_service.close()
+    await close_clients(app)
 
 app = FastAPI(
     title="fin-qdrant-rag",
@@ -139,6 +173,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -154,6 +189,23 @@ app.add_middleware(
 app.include_router(chat_router)
 app.include_router(upload_router)
 
+# Prometheus metrics (cache hit/miss counters, RAG stage latencies)
+app.mount("/metrics", make_asgi_app())
+
 @app.get("/")
-def root():
+async def root():
     return {"message": "Server running"}
+
+@app.get("/healthz")
+async def healthz(request: Request):
+    """Liveness probe: SELECT 1 on the asyncpg pool opened at startup."""
+    pg_pool = getattr(request.app.state, "pg_pool", None)
+    try:
+        if pg_pool is None:
+            raise RuntimeError("database pool not initialized")
+        async with pg_pool.acquire(timeout=5) as conn:
+            await conn.fetchval("SELECT 1")
+    except Exception as e:
+        logger.error("❌ Health check failed: %s", e)
+        return ORJSONResponse(status_code=503, content={"status": "unavailable", "database": str(e)})
+    return {"status": "ok"}
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from core.batching_embedding_client import BatchingEmbeddingClient
+
+
+async def test_concurrent_calls_are_coalesced():
+    inner = AsyncMock()
+    inner.get_embeddings = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    client = BatchingEmbeddingClient(inner, batch_window=0.01)
+
+    results = await asyncio.gather(
+        client.get_embeddings(["a"]),
+        client.get_embeddings(["bb", "ccc"]),
+        client.get_embeddings(["dddd"]),
+    )
+
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+    inner.get_embeddings.assert_awaited_once_with(["a", "bb", "ccc", "dddd"])
+    await client.close()
+
+
+async def test_batches_respect_max_batch():
+    inner = AsyncMock()
+    inner.get_embeddings = AsyncMock(side_effect=lambda texts: [[0.0] for _ in texts])
+    client = BatchingEmbeddingClient(inner, batch_window=0.01, max_batch=2)
+
+    result = await client.get_embeddings(["a", "b", "c", "d", "e"])
+
+    assert len(result) == 5
+    assert [len(call.args[0]) for call in inner.get_embeddings.await_args_list] == [2, 2, 1]
+    await client.close()
+
+
+async def test_errors_propagate_to_callers():
+    inner = AsyncMock()
+    inner.get_embeddings = AsyncMock(side_effect=Exception("OpenAI error"))
+    client = BatchingEmbeddingClient(inner, batch_window=0.001)
+
+    with pytest.raises(Exception, match="OpenAI error"):
+        await client.get_embeddings(["a"])
+    await client.close()
+
+
+@pytest.mark.parametrize("in_flight", [False, True], ids=["queued", "in_flight"])
+async def test_close_fails_pending_calls(in_flight):
+    inner = AsyncMock()
+    started = asyncio.Event()
+
+    async def never_returns(texts):
+        started.set()
+        await asyncio.Event().wait()
+
+    inner.get_embeddings = AsyncMock(side_effect=never_returns)
+    # A long window keeps the text queued; a short one lets the batch reach the stalled request
+    client = BatchingEmbeddingClient(inner, batch_window=0.001 if in_flight else 60)
+    pending = asyncio.create_task(client.get_embeddings(["a"]))
+    if in_flight:
+        await asyncio.wait_for(started.wait(), timeout=1)
+    else:
+        await asyncio.sleep(0)
+
+    await client.close()
+
+    with pytest.raises(RuntimeError, match="client closed"):
+        await asyncio.wait_for(pending, timeout=1)
+    inner.close.assert_awaited_once()
+
+
+def test_other_attributes_are_delegated():
+    inner = AsyncMock()
+    inner.model = "gpt-test"
+    client = BatchingEmbeddingClient(inner)
+    assert client.model == "gpt-test"
+    assert client.get_chat_completion is inner.get_chat_completion
+
+
+def test_rebinding_to_a_new_loop_fails_calls_left_on_the_old_one():
+    inner = AsyncMock()
+    inner.get_embeddings = AsyncMock(side_effect=lambda texts: [[0.0] for _ in texts])
+    client = BatchingEmbeddingClient(inner, batch_window=60)
+    old_loop, new_loop = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        # Queued on the old loop behind a window that never elapses
+        stranded = old_loop.create_task(client.get_embeddings(["a"]))
+        old_loop.run_until_complete(asyncio.sleep(0))
+
+        client.batch_window = 0.001
+        assert new_loop.run_until_complete(client.get_embeddings(["b"])) == [[0.0]]
+
+        with pytest.raises(RuntimeError, match="event loop changed"):
+            old_loop.run_until_complete(asyncio.wait_for(stranded, timeout=1))
+        inner.get_embeddings.assert_awaited_once_with(["b"])
+        new_loop.run_until_complete(client.close())
+    finally:
+        old_loop.close()
+        new_loop.close()
@@ -0,0 +1,56 @@
+import orjson
+import pytest
+from datetime import datetime, timezone
+from fastapi import status
+from unittest.mock import AsyncMock, MagicMock
+from core.hybrid_memory_manager import MemoryContext
+from features.endpoints.chat import get_rag_service
+from features.services.rag_service import RAGService, drain_background_tasks
+
+FIXED_TS = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def rag_service_with_context(app):
+    """Real RAGService with mocked memory and OpenAI clients, injected as the /chat dependency."""
+    rag_service = RAGService()
+    rag_service.hybrid_memory = AsyncMock()
+    rag_service.hybrid_memory.get_context_for_user = AsyncMock(return_value=MemoryContext(
+        short_term_context="[User: Hello!]",
+        long_term_context="[2024-01-01 12:00] Important Qdrant memory"
+    ))
+    rag_service.hybrid_memory.add_conversation_turn = AsyncMock(return_value={
+        "long_term_stored": False,
+        "memory_type": "short_term",
+        "importance_score": 0.5
+    })
+    rag_service.openai_client = AsyncMock()
+    rag_service.openai_client.get_embeddings = AsyncMock(return_value=[[0.1, 0.2, 0.3]])
+    rag_service.openai_client.get_chat_completion = AsyncMock(return_value="Mocked OpenAI response")
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    yield rag_service
+    app.dependency_overrides.pop(get_rag_service, None)
+
+async def test_chat_endpoint_with_qdrant_context(ac, mock_db_session, rag_service_with_context):
+    """
+    Test /chat endpoint with Qdrant-based context retrieval and OpenAI response generation.
+    """
+    # INSERT ... RETURNING id, timestamp
+    mock_db_session.execute.return_value = MagicMock(
+        one=MagicMock(return_value=MagicMock(id=1, timestamp=FIXED_TS))
+    )
+    response = await ac.post(
+        "/chat",
+        content=orjson.dumps({"user_message": "What do you remember?"}),
+        headers={"content-type": "application/json"}
+    )
+    await drain_background_tasks()
+
+    assert response.status_code == status.HTTP_200_OK
+    data = orjson.loads(response.content)
+    assert data["bot_response"] == "Mocked OpenAI response"
+    assert data["metadata"]["message_id"] == 1
+    mock_db_session.refresh.assert_not_awaited()
+    # The Qdrant memory reached the prompt
+    messages = rag_service_with_context.openai_client.get_chat_completion.call_args.kwargs["messages"]
+    assert "Important Qdrant memory" in messages[0]["content"]
+    rag_service_with_context.hybrid_memory.add_conversation_turn.assert_awaited_once()
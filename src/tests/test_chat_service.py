@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+from features.services.chat_service import ChatService
+
+@pytest.fixture
+def db():
+    """AsyncSession mock; tests set execute's side_effect/return_value to the rows they need."""
+    return AsyncMock(spec=AsyncSession)
+
+@pytest.fixture
+def chat_service(db):
+    """ChatService on the mocked session, with a stub RAGService so none is built."""
+    return ChatService(db, rag_service=MagicMock())
+
+def make_items(count):
+    return [{"user_message": f"Question {i}", "bot_response": f"Answer {i}"} for i in range(count)]
+
+async def test_create_chat_messages_bulk_batches_and_keeps_input_order(chat_service, db):
+    items = make_items(5)
+
+    def execute(stmt, params):
+        # Fake IDs derived from each row, so the result shows which rows came back in which order
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [100 + int(row["user_message"].split()[-1]) for row in params]
+        return result
+
+    db.execute.side_effect = execute
+
+    ids = await chat_service.create_chat_messages_bulk(items, batch_size=2)
+
+    assert ids == [100, 101, 102, 103, 104]
+    assert [call.args[1] for call in db.execute.await_args_list] == [items[0:2], items[2:4], items[4:5]]
+    db.commit.assert_awaited_once()
+
+async def test_create_chat_messages_bulk_empty_input(chat_service, db):
+    assert await chat_service.create_chat_messages_bulk([]) == []
+    db.execute.assert_not_awaited()
+    db.commit.assert_not_awaited()
+
+async def test_create_chat_messages_bulk_rolls_back_on_error(chat_service, db):
+    db.execute.side_effect = Exception("DB error")
+
+    with pytest.raises(Exception, match="DB error"):
+        await chat_service.create_chat_messages_bulk(make_items(3))
+
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+async def test_update_chat_message_returns_updated_row(chat_service, db):
+    updated = MagicMock()
+    db.execute.return_value = MagicMock(**{"scalar_one_or_none.return_value": updated})
+
+    result = await chat_service.update_chat_message(1, bot_response="New answer", metadata={"edited": True})
+
+    assert result is updated
+    # One UPDATE ... RETURNING round trip, no follow-up SELECT
+    db.execute.assert_awaited_once()
+    stmt = db.execute.await_args.args[0]
+    assert stmt.is_update
+    assert set(stmt.compile().params) >= {"bot_response", "message_metadata"}
+    db.commit.assert_awaited_once()
+
+async def test_update_chat_message_not_found(chat_service, db):
+    db.execute.return_value = MagicMock(**{"scalar_one_or_none.return_value": None})
+
+    assert await chat_service.update_chat_message(999, user_message="Hello") is None
+    db.execute.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+async def test_update_chat_message_without_changes_skips_the_query(chat_service, db):
+    assert await chat_service.update_chat_message(1) is None
+    db.execute.assert_not_awaited()
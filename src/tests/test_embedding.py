@@ -21,4 +21,22 @@ def test_get_embeddings_returns_vectors(mock_openai):
     for emb in result:
         assert isinstance(emb, list)
         assert all(isinstance(x, float) for x in emb)
-        assert len(emb) == 1536 
\ No newline at end of file
+        assert len(emb) == 1536
+
+
+@patch('src.core.utils.embedding.OpenAI')
+def test_get_embeddings_deduplicates_texts(mock_openai):
+    # Arrange
+    texts = ["header", "intro", "header", "outro", "header"]
+    vectors = {"header": [1.0], "intro": [2.0], "outro": [3.0]}
+    mock_client = MagicMock()
+    mock_client.embeddings.create.side_effect = lambda input, model: MagicMock(
+        data=[MagicMock(embedding=vectors[t]) for t in input]
+    )
+    mock_openai.return_value = mock_client
+    # Act
+    result = embedding.get_embeddings(texts, api_key="fake-key")
+    # Assert
+    sent = mock_client.embeddings.create.call_args.kwargs["input"]
+    assert sent == ["header", "intro", "outro"]
+    assert result == [[1.0], [2.0], [1.0], [3.0], [1.0]]
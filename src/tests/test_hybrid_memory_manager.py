@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+# Imported via src. so the conftest HybridMemoryManager patch doesn't replace the class under test
+from src.core.hybrid_memory_manager import HybridMemoryManager
+
+
+def make_manager():
+    manager = HybridMemoryManager.__new__(HybridMemoryManager)
+    manager.redis_memory = AsyncMock()
+    manager.qdrant_memory = AsyncMock()
+    manager.pdf_memory = AsyncMock()
+    manager.openai_client = AsyncMock()
+    return manager
+
+
+async def test_get_context_for_user_fetches_sources_concurrently():
+    manager = make_manager()
+    started = {name: asyncio.Event() for name in ("redis", "qdrant", "pdf")}
+
+    async def overlapping(name, value):
+        # Each source only returns once every source has started, which can't happen if they run one by one
+        started[name].set()
+        await asyncio.wait_for(asyncio.gather(*(event.wait() for event in started.values())), timeout=1)
+        return value
+
+    manager.redis_memory.get_recent_context = lambda *a, **k: overlapping("redis", "[12:00] User: Hi")
+    manager.qdrant_memory.get_user_memories = lambda *a, **k: overlapping("qdrant", [
+        {"id": 1, "content": "Likes AAPL", "timestamp": "2024-01-01T12:00:00"}
+    ])
+    manager.amplify_pdf_context = lambda *a, **k: overlapping("pdf", [{"id": 2, "content": "Chunk"}])
+
+    context = await manager.get_context_for_user("user_1", current_user_message="Hi")
+
+    assert all(event.is_set() for event in started.values())
+    assert len(context.short_term_memories) == 1
+    assert len(context.long_term_memories) == 1
+    assert context.pdf_context == "=== DOCUMENT KNOWLEDGE ===\nChunk\n"
+
+
+async def test_get_context_for_user_tolerates_failing_source():
+    manager = make_manager()
+    manager.redis_memory.get_recent_context = AsyncMock(return_value="[12:00] User: Hi")
+    manager.qdrant_memory.get_user_memories = AsyncMock(side_effect=Exception("Qdrant down"))
+    manager.amplify_pdf_context = AsyncMock(return_value=[])
+    manager.get_similar_memories_from_recent_message = AsyncMock(return_value=[])
+
+    context = await manager.get_context_for_user("user_1", current_user_message="Hi")
+
+    assert context.short_term_context == "[12:00] User: Hi"
+    assert context.long_term_memories == []
+    assert context.pdf_context == ""
+
+
+async def test_add_conversation_turn_scores_importance_off_the_event_loop():
+    import threading
+    from unittest.mock import patch
+    manager = make_manager()
+    scoring_threads = []
+
+    def evaluate(content, metadata):
+        scoring_threads.append(threading.current_thread())
+        return {"should_store_in_long_term": False}
+
+    with patch("src.core.hybrid_memory_manager.MemoryStrategyFactory.evaluate_content", side_effect=evaluate):
+        result = await manager.add_conversation_turn("user_1", "Hi", "Hello!")
+
+    manager.redis_memory.add_conversation_turn.assert_awaited_once_with("user_1", "Hi", "Hello!")
+    assert scoring_threads and scoring_threads[0] is not threading.main_thread()
+    assert result["long_term_stored"] is False
+
+
+async def test_close_leaves_injected_qdrant_clients_open():
+    shared_conversations, shared_pdfs = AsyncMock(), AsyncMock()
+    manager = HybridMemoryManager(openai_client=AsyncMock(), qdrant_memory=shared_conversations, pdf_memory=shared_pdfs)
+    manager.redis_memory = AsyncMock()
+
+    await manager.close()
+
+    manager.redis_memory.close.assert_awaited_once()
+    # The app's startup clients belong to the app and are closed at its shutdown
+    shared_conversations.close.assert_not_awaited()
+    shared_pdfs.close.assert_not_awaited()
+
+
+async def test_close_closes_qdrant_clients_it_created():
+    manager = HybridMemoryManager(openai_client=AsyncMock())
+    manager.redis_memory = AsyncMock()
+    owned = [AsyncMock(), AsyncMock()]
+    manager._owned_qdrant_clients = owned
+
+    await manager.close()
+
+    for qdrant_client in owned:
+        qdrant_client.close.assert_awaited_once()
@@ -1,11 +1,90 @@
+import asyncio
+import inspect
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
-from httpx import AsyncClient, ASGITransport
 from fastapi import status
-from src.main import app
+from fastapi.routing import APIRoute
+import src.main as main
 
-@pytest.mark.asyncio
-async def test_root_endpoint():
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
-        response = await ac.get("/")
+def test_root_endpoint(client):
+    # Plain synchronous GET on the session TestClient
+    response = client.get("/")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"message": "Server running"}
+
+def test_api_routes_are_async(app):
+    # Sync handlers would be dispatched to the threadpool on every request
+    sync_routes = [
+        route.path for route in app.routes
+        if isinstance(route, APIRoute) and not inspect.iscoroutinefunction(route.endpoint)
+    ]
+    assert sync_routes == []
+
+async def test_initialize_services_reports_all_failed_checks(app):
+    with patch('src.main.check_database_connection', new=AsyncMock(return_value=True)), \
+         patch('src.main.check_redis_connection', new=AsyncMock(return_value=False)), \
+         patch('src.main.check_qdrant_connection', new=AsyncMock(side_effect=RuntimeError("timeout"))):
+        with pytest.raises(Exception) as excinfo:
+            await main.initialize_services(app)
+    assert str(excinfo.value) == "Service checks failed: Redis, Qdrant (timeout)"
+
+async def test_failed_startup_closes_created_clients(monkeypatch):
+    pg_pool = AsyncMock()
+    qdrant_client = AsyncMock()
+
+    async def partial_startup(app):
+        app.state.pg_pool = pg_pool
+        app.state.qdrant_clients = {"pdf_documents": qdrant_client}
+        raise Exception("Service checks failed: Redis")
+
+    monkeypatch.setattr(main, "initialize_services", partial_startup)
+    fake_app = SimpleNamespace(state=SimpleNamespace())
+    with pytest.raises(Exception, match="Redis"):
+        async with main.lifespan(fake_app):
+            pass
+    pg_pool.close.assert_awaited_once()
+    qdrant_client.close.assert_awaited_once()
+    assert fake_app.state.pg_pool is None
+
+async def test_shutdown_awaits_cancelled_cache_stats_task(monkeypatch):
+    stopped = asyncio.Event()
+
+    async def log_stats(cache):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            stopped.set()
+
+    async def close_clients(app):
+        # The stats task must already be finished when the clients are closed
+        assert stopped.is_set()
+
+    monkeypatch.setattr(main, "initialize_services", AsyncMock())
+    monkeypatch.setattr(main, "RAGService", MagicMock(return_value=MagicMock(response_cache=object(), close=AsyncMock())))
+    monkeypatch.setattr(main, "log_cache_stats_periodically", log_stats)
+    monkeypatch.setattr(main, "drain_background_tasks", AsyncMock())
+    monkeypatch.setattr(main, "close_clients", AsyncMock(side_effect=close_clients))
+    async with main.lifespan(SimpleNamespace(state=SimpleNamespace())):
+        await asyncio.sleep(0)
+    main.close_clients.assert_awaited_once()
+
+async def test_healthz_uses_pg_pool(ac, app):
+    conn = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=1)
+    acquire = MagicMock()
+    acquire.__aenter__ = AsyncMock(return_value=conn)
+    acquire.__aexit__ = AsyncMock(return_value=False)
+    app.state.pg_pool = MagicMock(acquire=MagicMock(return_value=acquire))
+    try:
+        response = await ac.get("/healthz")
+    finally:
+        del app.state.pg_pool
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ok"}
+    conn.fetchval.assert_awaited_once_with("SELECT 1")
+
+async def test_healthz_without_pool_is_unavailable(ac):
+    response = await ac.get("/healthz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "unavailable"
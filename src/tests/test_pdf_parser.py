@@ -1,28 +1,31 @@
-import os
 import pytest
 from src.core.utils import parser
 import re
 
-TEST_PDF_PATH = os.path.join(os.path.dirname(__file__), '../../data/test/test_01.pdf')
+# Sentence boundary: a period followed by whitespace or end of text
+SENTENCE_SPLIT_RE = re.compile(r'\.(?=\s|$)')
 
 @pytest.fixture(scope="module")
-def sample_pdf_path():
-    assert os.path.exists(TEST_PDF_PATH), f"Test PDF not found at {TEST_PDF_PATH}"
-    return TEST_PDF_PATH
+def extracted_text(sample_pdf_path):
+    """Text of the sample PDF, parsed once for the whole module."""
+    return parser.extract_text_from_pdf(sample_pdf_path)
 
-def test_extract_text_from_pdf(sample_pdf_path):
-    text = parser.extract_text_from_pdf(sample_pdf_path)
-    assert isinstance(text, str)
-    assert len(text) > 0, "Extracted text should not be empty."
+def test_extract_text_from_pdf(extracted_text):
+    assert isinstance(extracted_text, str)
+    assert len(extracted_text) > 0, "Extracted text should not be empty."
     # Optionally, check for known content if you know what's in the test PDF
 
+def test_extract_text_from_pdf_bytes(pdf_bytes, extracted_text):
+    text = parser.extract_text_from_pdf_bytes(pdf_bytes)
+    assert text == extracted_text
+
 def test_chunk_text_basic():
     text = "This is a test. " * 100  # 1700 chars
     chunk_size = 100
     chunks = parser.chunk_text(text, chunk_size)
     assert isinstance(chunks, list)
-    assert all(isinstance(chunk, str) for chunk in chunks)
-    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    assert {type(chunk) for chunk in chunks} == {str}
+    assert max(map(len, chunks)) <= chunk_size
     assert ''.join(chunks).replace(' ', '') == text.replace(' ', '')  # No data loss
 
 def test_chunk_text_edge_cases():
@@ -49,7 +52,7 @@ def test_chunk_text_context_aware_basic():
     if len(chunks) > 1:
         def get_sentences(chunk):
             # Split on period, remove empty, and strip
-            return [s.strip() for s in re.split(r'\.(?=\s|$)', chunk) if s.strip()]
+            return [s.strip() for s in SENTENCE_SPLIT_RE.split(chunk) if s.strip()]
         prev_sentences = get_sentences(chunks[0])
         next_sentences = get_sentences(chunks[1])
         assert prev_sentences[-1] == next_sentences[0]
@@ -1,6 +1,9 @@
 import pytest
 from src.features.models.pydantic.chat import ChatRequest, ChatResponse
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Fixed so the tests don't depend on (or pay for) the current time
+FIXED_TS = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
 
 # Test valid ChatRequest
 def test_chat_request_valid():
@@ -14,11 +17,11 @@ def test_chat_request_invalid():
 
 # Test valid ChatResponse
 def test_chat_response_valid():
-    resp = ChatResponse(bot_response="Hi!", timestamp=datetime.utcnow())
+    resp = ChatResponse(bot_response="Hi!", timestamp=FIXED_TS)
     assert resp.bot_response == "Hi!"
-    assert isinstance(resp.timestamp, datetime)
+    assert resp.timestamp == FIXED_TS
 
 # Test ChatResponse with optional metadata
 def test_chat_response_with_metadata():
-    resp = ChatResponse(bot_response="Hi!", timestamp=datetime.utcnow(), metadata={"foo": "bar"})
+    resp = ChatResponse(bot_response="Hi!", timestamp=FIXED_TS, metadata={"foo": "bar"})
     assert resp.metadata == {"foo": "bar"} 
\ No newline at end of file
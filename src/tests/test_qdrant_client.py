@@ -1,20 +1,29 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+import core.qdrant_client as qc
 from core.qdrant_client import QdrantMemoryClient
 import uuid
 import logging
 
-@pytest.mark.asyncio
-@patch('core.qdrant_client.AsyncQdrantClient')
-async def test_store_memory_item_success(mock_async_client):
+# Shared by all tests; the client only reads it
+FAKE_EMBEDDING = [0.1] * 1536
+
+@pytest.fixture
+def qdrant_memory_client():
+    """QdrantMemoryClient whose AsyncQdrantClient is a single mock instance."""
+    with patch.object(qc, 'AsyncQdrantClient') as mock_async_client:
+        client = QdrantMemoryClient(collection_name='test_collection')
+        client.client = mock_async_client.return_value
+        yield client
+
+async def test_store_memory_item_success(qdrant_memory_client):
     # Arrange
     collection_name = 'test_collection'
-    client = QdrantMemoryClient(collection_name=collection_name)
-    client.client = mock_async_client()
+    client = qdrant_memory_client
     mock_upsert = AsyncMock()
     client.client.upsert = mock_upsert
     content = "Test content"
-    embedding = [0.1] * 1536
+    embedding = FAKE_EMBEDDING
     user_id = "user_123"
     memory_type = "test_type"
     metadata = {"foo": "bar"}
@@ -44,17 +53,14 @@ async def test_store_memory_item_success(mock_async_client):
     assert isinstance(point.payload["timestamp"], str)
     assert point.vector == embedding
 
-@pytest.mark.asyncio
-@patch('core.qdrant_client.AsyncQdrantClient')
-async def test_store_memory_item_error(mock_async_client, caplog):
+async def test_store_memory_item_error(qdrant_memory_client, caplog):
     # Arrange
     collection_name = 'test_collection'
-    client = QdrantMemoryClient(collection_name=collection_name)
-    client.client = mock_async_client()
+    client = qdrant_memory_client
     mock_upsert = AsyncMock(side_effect=Exception("Qdrant error"))
     client.client.upsert = mock_upsert
     content = "Test content"
-    embedding = [0.1] * 1536
+    embedding = FAKE_EMBEDDING
     user_id = "user_123"
 
     # Act & Assert
@@ -62,4 +68,49 @@ async def test_store_memory_item_error(mock_async_client, caplog):
         with pytest.raises(Exception) as excinfo:
             await client.store_memory_item(content, embedding, user_id)
         assert "Error storing memory item" in caplog.text
-        assert "Qdrant error" in str(excinfo.value) 
\ No newline at end of file
+        assert "Qdrant error" in str(excinfo.value)
+
+async def test_store_memory_items_sub_batches(qdrant_memory_client):
+    # Arrange
+    client = qdrant_memory_client
+    mock_upsert = AsyncMock()
+    client.client.upsert = mock_upsert
+    contents = [f"chunk {i}" for i in range(5)]
+    embeddings = [FAKE_EMBEDDING] * len(contents)
+
+    # Act
+    point_ids = await client.store_memory_items(
+        contents=contents,
+        embeddings=embeddings,
+        user_id="pdf_upload",
+        memory_type="pdf_chunk",
+        metadata={"document_id": "doc1"},
+        batch_size=2
+    )
+
+    # Assert
+    assert len(point_ids) == 5
+    assert mock_upsert.await_count == 3
+    batches = [call.kwargs["points"] for call in mock_upsert.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [p.id for batch in batches for p in batch] == point_ids
+    assert all(call.kwargs["wait"] is False for call in mock_upsert.call_args_list)
+    assert batches[0][0].payload["metadata"] == {"document_id": "doc1"}
+
+async def test_delete_points_by_document_ids(qdrant_memory_client):
+    # Arrange
+    client = qdrant_memory_client
+    client.client.scroll = AsyncMock(return_value=([MagicMock(id=101), MagicMock(id=103)], None))
+    client.client.delete = AsyncMock()
+
+    # Act
+    deleted = await client.delete_points_by_document_ids(["doc1", "doc3"])
+
+    # Assert
+    assert deleted == [101, 103]
+    scroll_filter = client.client.scroll.call_args.kwargs["scroll_filter"]
+    assert scroll_filter.must[0].key == "metadata.document_id"
+    assert scroll_filter.must[0].match.any == ["doc1", "doc3"]
+    selector = client.client.delete.call_args.kwargs["points_selector"]
+    assert selector.filter == scroll_filter
+
@@ -1,95 +1,101 @@
 import pytest
-from unittest.mock import AsyncMock, patch
-from src.features.services.rag_service import RAGService
+from unittest.mock import AsyncMock
+from src.features.services import rag_service as rag_module
+from src.features.services.rag_service import RAGService, drain_background_tasks
 from core.stock_assistant_config import StockAssistantConfig
-from src.features.models.pydantic.memory import MemoryStats
+from core.hybrid_memory_manager import MemoryContext
+from src.features.models.msgspec.memory import MemoryStats
 
-@pytest.mark.asyncio
-async def test_rag_service_initialization():
+async def test_rag_service_initialization(mock_hybrid):
     """Test that RAG service initializes properly."""
-    with patch('core.openai_client.OpenAIClient'), \
-         patch('core.hybrid_memory_manager.HybridMemoryManager') as mock_hybrid:
-        rag_service = RAGService()
-        assert rag_service.hybrid_memory is not None
-        assert rag_service.config is not None
-        assert isinstance(rag_service.config, StockAssistantConfig)
-
-@pytest.mark.asyncio
-async def test_process_user_message_with_memory():
+    rag_service = RAGService()
+    assert rag_service.hybrid_memory is mock_hybrid
+    assert rag_service.config is not None
+    assert isinstance(rag_service.config, StockAssistantConfig)
+
+async def test_rag_service_reuses_injected_qdrant_clients(mock_hybrid):
+    qdrant_clients = {"conversations": AsyncMock(), "pdf_documents": AsyncMock()}
+    RAGService(qdrant_clients=qdrant_clients)
+    kwargs = rag_module.HybridMemoryManager.call_args.kwargs
+    assert kwargs["qdrant_memory"] is qdrant_clients["conversations"]
+    assert kwargs["pdf_memory"] is qdrant_clients["pdf_documents"]
+
+async def test_rag_service_close_releases_memory_connections(mock_hybrid):
+    rag_service = RAGService()
+    rag_service.openai_client = AsyncMock()
+    await rag_service.close()
+    mock_hybrid.close.assert_awaited_once()
+    rag_service.openai_client.close.assert_awaited_once()
+
+async def test_process_user_message_with_memory(mock_hybrid):
     """Test processing user message with memory context."""
-    with patch('core.openai_client.OpenAIClient') as mock_openai_class, \
-         patch('core.hybrid_memory_manager.HybridMemoryManager') as mock_hybrid_class:
-        # Create a mock OpenAI client
-        mock_client = AsyncMock()
-        mock_client.get_chat_completion = AsyncMock(return_value="I can help you with stock analysis.")
-        mock_openai_class.return_value = mock_client
-        
-        # Mock HybridMemoryManager
-        mock_hybrid = AsyncMock()
-        mock_hybrid.get_context_for_user = AsyncMock(return_value={
-            "short_term_context": "[12:00] User: What stocks should I buy?\n[12:01] Assistant: I'd recommend looking at tech stocks.",
-            "long_term_context": "",
-        })
-        mock_hybrid.add_conversation_turn = AsyncMock(return_value={
-            "long_term_stored": False,
-            "memory_type": "short_term",
-            "importance_score": 0.5
-        })
-        mock_hybrid_class.return_value = mock_hybrid
-        
-        # Create RAG service with mocked dependencies
-        rag_service = RAGService()
-        rag_service.openai_client = mock_client
-        rag_service.hybrid_memory = mock_hybrid
-        
-        # Process new message
-        response = await rag_service.process_user_message("Tell me more about tech stocks")
-        assert response == "I can help you with stock analysis."
-        # Verify HybridMemoryManager operations were called
-        mock_hybrid.get_context_for_user.assert_called_once()
-        mock_hybrid.add_conversation_turn.assert_called_once()
-
-@pytest.mark.asyncio
-async def test_memory_persistence():
+    # Create a mock OpenAI client
+    mock_client = AsyncMock()
+    mock_client.get_chat_completion = AsyncMock(return_value="I can help you with stock analysis.")
+    mock_hybrid.get_context_for_user.return_value = MemoryContext(
+        short_term_context="[12:00] User: What stocks should I buy?\n[12:01] Assistant: I'd recommend looking at tech stocks.",
+    )
+    
+    rag_service = RAGService()
+    rag_service.openai_client = mock_client
+    
+    # Process new message
+    response = await rag_service.process_user_message("Tell me more about tech stocks")
+    assert response == "I can help you with stock analysis."
+    # The conversation turn is persisted in the background
+    await drain_background_tasks()
+    # Verify HybridMemoryManager operations were called
+    mock_hybrid.get_context_for_user.assert_called_once()
+    mock_hybrid.add_conversation_turn.assert_called_once()
+
+async def test_memory_persistence(mock_hybrid):
     """Test that memory is properly managed."""
-    with patch('core.openai_client.OpenAIClient'), \
-         patch('core.hybrid_memory_manager.HybridMemoryManager') as mock_hybrid_class:
-        # Create a proper MemoryStats object for the mock
-        mock_memory_stats = {
-            "redis": {"active_conversations": 2, "active_sessions": 1, "memory_usage": "1.2M", "ttl_hours": 24},
-            "qdrant": {"name": "long_term_memory", "vectors_count": 0, "points_count": 0, "status": "green"},
-            "total_memories": 0
-        }
-        mock_hybrid = AsyncMock()
-        mock_hybrid.get_memory_stats = AsyncMock(return_value=mock_memory_stats)
-        mock_hybrid_class.return_value = mock_hybrid
-        
-        rag_service = RAGService()
-        rag_service.hybrid_memory = mock_hybrid
-        
-        # Check memory summary
-        summary = await rag_service.get_memory_summary()
-        assert summary["redis"]["active_conversations"] == 2
-        assert summary["redis"]["active_sessions"] == 1
-
-@pytest.mark.asyncio
-async def test_memory_clearing():
+    mock_hybrid.get_memory_stats.return_value = {
+        "redis": {"active_conversations": 2, "active_sessions": 1, "memory_usage": "1.2M", "ttl_hours": 24},
+        "qdrant": {"name": "long_term_memory", "vectors_count": 0, "points_count": 0, "status": "green"},
+        "total_memories": 0
+    }
+    rag_service = RAGService()
+    
+    # Check memory summary
+    summary = await rag_service.get_memory_summary()
+    assert summary["redis"]["active_conversations"] == 2
+    assert summary["redis"]["active_sessions"] == 1
+
+async def test_memory_clearing(mock_hybrid):
     """Test memory clearing functionality."""
-    with patch('core.openai_client.OpenAIClient'), \
-         patch('core.hybrid_memory_manager.HybridMemoryManager') as mock_hybrid_class:
-        mock_hybrid = AsyncMock()
-        mock_hybrid.clear_user_memory = AsyncMock()
-        mock_hybrid_class.return_value = mock_hybrid
-        
-        rag_service = RAGService()
-        rag_service.hybrid_memory = mock_hybrid
-        
-        # Clear user memory
-        await rag_service.clear_user_memory("test_user")
-        # Verify clear operation was called
-        mock_hybrid.clear_user_memory.assert_called_once_with("test_user")
-
-@pytest.mark.asyncio
+    rag_service = RAGService()
+    
+    # Clear user memory
+    await rag_service.clear_user_memory("test_user")
+    # Verify clear operation was called
+    mock_hybrid.clear_user_memory.assert_called_once_with("test_user")
+
+def test_build_messages_with_context():
+    """Test that memory context is appended to the system prompt in order."""
+    rag_service = RAGService()
+    base_prompt = rag_service.config.get_system_prompt()
+    messages = rag_service._build_messages("Hi", MemoryContext(
+        short_term_context="[12:00] User: Hello",
+        long_term_context="=== IMPORTANT MEMORIES ===\n[2024-01-01 12:00] Likes AAPL\n",
+        pdf_context="=== DOCUMENT KNOWLEDGE ===\nChunk\n"
+    ))
+    assert messages[0]["content"] == (
+        base_prompt
+        + "\n\nMemory Context:\n=== RECENT CONVERSATION ===\n[12:00] User: Hello"
+        + "\n=== IMPORTANT MEMORIES ===\n[2024-01-01 12:00] Likes AAPL\n"
+        + "\n=== DOCUMENT KNOWLEDGE ===\nChunk\n"
+    )
+    assert messages[1] == {"role": "user", "content": "Hi"}
+    # No context leaves the system prompt untouched
+    assert rag_service._build_messages("Hi", MemoryContext())[0]["content"] is rag_service._system_prompt == base_prompt
+
+def test_should_add_to_long_term():
+    rag_service = RAGService()
+    assert rag_service._should_add_to_long_term("Which STOCKS pay dividends?", "")
+    assert rag_service._should_add_to_long_term("Review my portfolio", "")
+    assert not rag_service._should_add_to_long_term("Hello there", "")
+
 async def test_config_loading():
     """Test that configuration loads properly."""
     config = StockAssistantConfig()
@@ -107,18 +113,21 @@ async def test_config_loading():
     assert "model" in openai_settings
     assert "temperature" in openai_settings 
 
-@pytest.mark.asyncio
 async def test_extract_keywords():
-    from core.openai_client import OpenAIClient
+    # Imported via src. so the conftest OpenAIClient patch doesn't replace the class under test
+    from src.core.openai_client import OpenAIClient
     client = OpenAIClient()
     # Patch get_chat_completion to return a fake keyword list
     client.get_chat_completion = AsyncMock(return_value="finance, investing, risk")
     keywords = await client.extract_keywords("Tell me about finance and investing risk.", n=3)
     assert keywords == ["finance", "investing", "risk"]
+    # Multi-word keywords keep their inner spaces; empty entries are dropped
+    client.get_chat_completion = AsyncMock(return_value=" interest rates, ,Fed \n")
+    assert await client.extract_keywords("Rates?", n=3) == ["interest rates", "Fed"]
 
-@pytest.mark.asyncio
 async def test_rerank_chunks_with_threshold():
-    from core.openai_client import OpenAIClient
+    # Imported via src. so the conftest OpenAIClient patch doesn't replace the class under test
+    from src.core.openai_client import OpenAIClient
     client = OpenAIClient()
     # Patch get_chat_completion to return a fake JSON score list
     client.get_chat_completion = AsyncMock(return_value='[{"index": 1, "score": 0.8}, {"index": 2, "score": 0.3}]')
@@ -130,11 +139,21 @@ async def test_rerank_chunks_with_threshold():
     assert len(reranked) == 1
     assert reranked[0]["content"] == "Relevant chunk."
 
-@pytest.mark.asyncio
+async def test_rerank_chunks_sorts_by_score_with_duplicate_chunks():
+    from src.core.openai_client import OpenAIClient
+    client = OpenAIClient()
+    client.get_chat_completion = AsyncMock(return_value='[{"index": 1, "score": 0.6}, {"index": 2, "score": 0.9}, {"index": 3, "score": 0.7}]')
+    # Equal chunks used to collapse onto the first one's score via chunks.index()
+    chunks = [{"content": "Same"}, {"content": "Best"}, {"content": "Same"}]
+    reranked = await client.rerank_chunks_with_threshold("q", chunks, threshold=0.5)
+    assert [c["content"] for c in reranked] == ["Best", "Same", "Same"]
+    assert reranked[1] is chunks[2] and reranked[2] is chunks[0]
+
 async def test_amplify_pdf_context_fallback_and_rerank():
-    from core.hybrid_memory_manager import HybridMemoryManager
-    from core.openai_client import OpenAIClient
-    manager = HybridMemoryManager()
+    # Imported via src. so the conftest HybridMemoryManager patch doesn't replace the class under test
+    from src.core.hybrid_memory_manager import HybridMemoryManager
+    manager = HybridMemoryManager.__new__(HybridMemoryManager)
+    manager.openai_client = AsyncMock()
     # Patch openai_client methods
     manager.openai_client.generate_sub_questions = AsyncMock(return_value=["What is finance?"])
     manager.openai_client.get_embeddings = AsyncMock(return_value=[[0.1, 0.2, 0.3]])
@@ -145,4 +164,24 @@ async def test_amplify_pdf_context_fallback_and_rerank():
     manager.openai_client.rerank_chunks_with_threshold = AsyncMock(return_value=[{"id": "1", "content": "Finance PDF chunk."}])
     results = await manager.amplify_pdf_context("Tell me about finance.", pdf_limit=2, rerank_threshold=0.5)
     assert len(results) == 1
-    assert results[0]["content"] == "Finance PDF chunk." 
\ No newline at end of file
+    assert results[0]["content"] == "Finance PDF chunk."
+
+
+async def test_process_with_functions_uses_hybrid_memory(mock_hybrid):
+    mock_hybrid.get_context_for_user.return_value = MemoryContext(short_term_context="[12:00] User: Hi")
+    rag_service = RAGService()
+    rag_service.openai_client = AsyncMock()
+    rag_service.openai_client.get_chat_completion_with_functions = AsyncMock(return_value={
+        "content": "AAPL is trading at $190.",
+        "function_call": None
+    })
+
+    result = await rag_service.process_with_functions("What is AAPL trading at?", user_id="user_1")
+    await drain_background_tasks()
+
+    assert result["content"] == "AAPL is trading at $190."
+    messages = rag_service.openai_client.get_chat_completion_with_functions.call_args.kwargs["messages"]
+    assert "[12:00] User: Hi" in messages[0]["content"]
+    mock_hybrid.add_conversation_turn.assert_awaited_once_with(
+        "user_1", "What is AAPL trading at?", "AAPL is trading at $190."
+    )
@@ -1,11 +1,37 @@
 import pytest
 import os
-from unittest.mock import AsyncMock, patch
-from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timezone
 from src.core.redis_memory_manager import RedisMemoryManager
-from src.features.models.pydantic.memory import ConversationTurn, UserSession, MemoryStats
+from src.features.models.msgspec.memory import ConversationTurn, UserSession, MemoryStats
+
+def epoch_ns(*args):
+    """UTC epoch nanoseconds for datetime(*args)."""
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+@pytest.fixture(scope="module")
+def _shared_redis_client():
+    return AsyncMock()
+
+@pytest.fixture
+def mock_redis(monkeypatch, _shared_redis_client):
+    """One AsyncMock Redis client for the module, returned by get_redis_client and reset after each test."""
+    monkeypatch.setattr("src.core.redis_memory_manager.get_redis_client", AsyncMock(return_value=_shared_redis_client))
+    # pipeline() is sync and returns an async context manager whose commands are buffered
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock()
+    _shared_redis_client.pipeline = MagicMock(return_value=pipe)
+    yield _shared_redis_client
+    _shared_redis_client.reset_mock(return_value=True, side_effect=True)
+
+@pytest.fixture
+def memory_manager(mock_redis):
+    """RedisMemoryManager already wired to mock_redis, so no real connection is attempted."""
+    manager = RedisMemoryManager()
+    manager.redis_client = mock_redis
+    return manager
 
-@pytest.mark.asyncio
 async def test_redis_memory_manager_initialization():
     """Test Redis memory manager initialization with environment variables."""
     with patch.dict(os.environ, {"REDIS_URL": "redis://test:6379", "REDIS_TTL_HOURS": "48"}):
@@ -14,7 +40,6 @@ async def test_redis_memory_manager_initialization():
         assert memory_manager.ttl_hours == 48
         assert memory_manager.redis_client is None  # Not connected yet
 
-@pytest.mark.asyncio
 async def test_redis_memory_manager_custom_initialization():
     """Test Redis memory manager with custom parameters."""
     memory_manager = RedisMemoryManager(
@@ -25,213 +50,224 @@ async def test_redis_memory_manager_custom_initialization():
     assert memory_manager.redis_url == "redis://custom:6379"
     assert memory_manager.ttl_hours == 12
 
-@pytest.mark.asyncio
-async def test_add_conversation_turn():
+async def test_add_conversation_turn(mock_redis, memory_manager):
     """Test adding a conversation turn to Redis."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        # Test adding conversation turn
-        await memory_manager.add_conversation_turn(
-            user_id="test_user",
-            user_message="Hello",
-            assistant_response="Hi there!"
-        )
-        
-        # Verify Redis operations were called
-        mock_client.lpush.assert_called_once()
-        mock_client.expire.assert_called_once()
-
-@pytest.mark.asyncio
-async def test_get_recent_context():
+    # Test adding conversation turn
+    await memory_manager.add_conversation_turn(
+        user_id="test_user",
+        user_message="Hello",
+        assistant_response="Hi there!"
+    )
+    
+    # All three commands go out in a single pipeline round trip
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    pipe = mock_redis.pipeline.return_value
+    pipe.lpush.assert_called_once()
+    assert pipe.lpush.call_args.args[0] == "conversation:test_user"
+    pipe.ltrim.assert_called_once_with("conversation:test_user", 0, memory_manager.max_turns - 1)
+    pipe.expire.assert_called_once_with("conversation:test_user", memory_manager.ttl_hours * 3600)
+    pipe.execute.assert_awaited_once()
+    mock_redis.lpush.assert_not_called()
+
+async def test_get_recent_context(mock_redis, memory_manager):
     """Test getting recent context from Redis."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        # Create test conversation turns
-        turn1 = ConversationTurn(
-            user_message="Hello",
-            assistant_response="Hi!",
-            timestamp=datetime(2023, 1, 1, 12, 0, 0)
-        )
-        turn2 = ConversationTurn(
-            user_message="How are you?",
-            assistant_response="Good!",
-            timestamp=datetime(2023, 1, 1, 12, 1, 0)
-        )
-        
-        # Mock Redis response with JSON strings
-        mock_client.lrange.return_value = [
-            turn1.to_json(),
-            turn2.to_json()
-        ]
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        context = await memory_manager.get_recent_context("test_user", limit=2)
-        
-        assert "Hello" in context
-        assert "Hi!" in context
-        assert "How are you?" in context
-        assert "Good!" in context
-
-@pytest.mark.asyncio
-async def test_get_recent_context_empty():
+    # Create test conversation turns
+    turn1 = ConversationTurn(
+        user_message="Hello",
+        assistant_response="Hi!",
+        timestamp_ns=epoch_ns(2023, 1, 1, 12, 0, 0)
+    )
+    turn2 = ConversationTurn(
+        user_message="How are you?",
+        assistant_response="Good!",
+        timestamp_ns=epoch_ns(2023, 1, 1, 12, 1, 0)
+    )
+    
+    # Mock Redis response with JSON strings
+    mock_redis.lrange.return_value = [
+        turn1.to_json(),
+        turn2.to_json()
+    ]
+
+    context = await memory_manager.get_recent_context("test_user", limit=2)
+    
+    assert "[12:00] User: Hello" in context
+    assert "Hi!" in context
+    assert "How are you?" in context
+    assert "Good!" in context
+
+async def test_get_recent_context_served_from_l1_cache(mock_redis, memory_manager):
+    """Repeated reads within the TTL skip Redis; a new turn invalidates the user's entry."""
+    turn = ConversationTurn(user_message="Hello", assistant_response="Hi!", timestamp_ns=epoch_ns(2023, 1, 1, 12, 0, 0))
+    mock_redis.lrange.return_value = [turn.to_json()]
+
+    first = await memory_manager.get_recent_context("test_user", limit=2)
+    second = await memory_manager.get_recent_context("test_user", limit=2)
+
+    assert first == second
+    mock_redis.lrange.assert_awaited_once()
+
+    await memory_manager.add_conversation_turn("test_user", "Again", "Sure")
+    await memory_manager.get_recent_context("test_user", limit=2)
+    assert mock_redis.lrange.await_count == 2
+
+async def test_get_recent_context_cache_disabled(mock_redis, memory_manager):
+    """A zero context_cache_ttl sends every read to Redis."""
+    mock_redis.lrange.return_value = []
+    memory_manager.context_cache_ttl = 0.0
+
+    await memory_manager.get_recent_context("test_user")
+    await memory_manager.get_recent_context("test_user")
+
+    assert mock_redis.lrange.await_count == 2
+
+async def test_get_recent_context_not_cached_when_write_races_read(mock_redis, memory_manager):
+    """A turn added while lrange is in flight keeps the stale result out of the L1 cache."""
+    turn = ConversationTurn(user_message="Hello", assistant_response="Hi!", timestamp_ns=epoch_ns(2023, 1, 1, 12, 0, 0))
+
+    async def lrange_racing_a_write(*args):
+        await memory_manager.add_conversation_turn("test_user", "Again", "Sure")
+        return [turn.to_json()]
+
+    mock_redis.lrange.side_effect = lrange_racing_a_write
+    await memory_manager.get_recent_context("test_user", limit=2)
+
+    mock_redis.lrange.side_effect = None
+    mock_redis.lrange.return_value = []
+    await memory_manager.get_recent_context("test_user", limit=2)
+    assert mock_redis.lrange.await_count == 2
+
+def test_conversation_turn_json_roundtrip():
+    """Test ConversationTurn JSON encoding round-trips through msgspec without whitespace."""
+    turn = ConversationTurn(
+        user_message="Hello",
+        assistant_response="Hi!",
+        timestamp_ns=epoch_ns(2023, 1, 1, 12, 0, 0)
+    )
+
+    payload = turn.to_json()
+
+    assert ConversationTurn.from_json(payload) == turn
+    assert ", " not in payload and '": ' not in payload
+
+def test_conversation_turn_msgpack_roundtrip():
+    """Test ConversationTurn msgpack encoding round-trips and is smaller than JSON."""
+    turn = ConversationTurn(
+        user_message="Hello",
+        assistant_response="Hi!",
+        timestamp_ns=epoch_ns(2023, 1, 1, 12, 0, 0)
+    )
+
+    payload = turn.to_msgpack()
+    restored = ConversationTurn.from_msgpack(payload)
+
+    assert restored == turn
+    assert len(payload) < len(turn.to_json())
+
+async def test_get_recent_context_empty(mock_redis, memory_manager):
     """Test getting recent context when no data exists."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        # Mock empty Redis response
-        mock_client.lrange.return_value = []
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        context = await memory_manager.get_recent_context("test_user")
-        
-        assert context == ""
-
-@pytest.mark.asyncio
-async def test_get_user_session_data():
+    # Mock empty Redis response
+    mock_redis.lrange.return_value = []
+
+    context = await memory_manager.get_recent_context("test_user")
+    
+    assert context == ""
+
+async def test_get_user_session_data(mock_redis, memory_manager):
     """Test getting user session data."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        # Create test session data
-        test_session = UserSession(
-            user_id="test_user",
-            preferences={"theme": "dark"},
-            metadata={"last_login": "2023-01-01T12:00:00"}
-        )
-        
-        # Mock Redis response with session data
-        mock_client.hgetall.return_value = test_session.to_redis_dict()
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        session_data = await memory_manager.get_user_session_data("test_user")
-        
-        # Use type name comparison instead of isinstance
-        assert type(session_data).__name__ == "UserSession"
-        assert session_data.user_id == "test_user"
-        assert session_data.preferences["theme"] == "dark"
-
-@pytest.mark.asyncio
-async def test_get_user_session_data_empty():
+    # Create test session data
+    test_session = UserSession(
+        user_id="test_user",
+        preferences={"theme": "dark"},
+        metadata={"last_login": "2023-01-01T12:00:00"}
+    )
+    
+    # Mock Redis response with session data
+    mock_redis.hgetall.return_value = test_session.to_redis_dict()
+
+    session_data = await memory_manager.get_user_session_data("test_user")
+    
+    # Use type name comparison instead of isinstance
+    assert type(session_data).__name__ == "UserSession"
+    assert session_data.user_id == "test_user"
+    assert session_data.preferences["theme"] == "dark"
+
+async def test_get_user_session_data_empty(mock_redis, memory_manager):
     """Test getting user session data when no data exists."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        # Mock empty Redis response
-        mock_client.hgetall.return_value = {}
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        session_data = await memory_manager.get_user_session_data("test_user")
-        
-        # Use type name comparison instead of isinstance
-        assert type(session_data).__name__ == "UserSession"
-        assert session_data.user_id == "test_user"
-        assert session_data.preferences == {}
-        assert session_data.metadata == {}
-
-@pytest.mark.asyncio
-async def test_update_user_session():
+    # Mock empty Redis response
+    mock_redis.hgetall.return_value = {}
+
+    session_data = await memory_manager.get_user_session_data("test_user")
+    
+    # Use type name comparison instead of isinstance
+    assert type(session_data).__name__ == "UserSession"
+    assert session_data.user_id == "test_user"
+    assert session_data.preferences == {}
+    assert session_data.metadata == {}
+
+async def test_update_user_session(mock_redis, memory_manager):
     """Test updating user session data."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        session_data = {
-            "preferences": {"theme": "light"},
-            "metadata": {"last_activity": "2023-01-01T12:00:00"}
-        }
-        
-        await memory_manager.update_user_session("test_user", session_data)
-        
-        # Verify hset and expire were called
-        mock_client.hset.assert_called_once()
-        mock_client.expire.assert_called_once()
-
-@pytest.mark.asyncio
-async def test_clear_user_memory():
+    session_data = {
+        "preferences": {"theme": "light"},
+        "metadata": {"last_activity": "2023-01-01T12:00:00"}
+    }
+    
+    await memory_manager.update_user_session("test_user", session_data)
+    
+    # Verify hset and expire were called
+    mock_redis.hset.assert_called_once()
+    mock_redis.expire.assert_called_once()
+
+def test_user_session_from_data_ignores_unknown_keys():
+    """Test UserSession.from_data validates known fields and drops the rest."""
+    session = UserSession.from_data("test_user", {
+        "preferences": {"theme": "light"},
+        "last_activity": "2023-01-01T12:00:00",
+        "unexpected": True
+    })
+
+    assert session.user_id == "test_user"
+    assert session.preferences == {"theme": "light"}
+    assert session.last_activity == datetime(2023, 1, 1, 12, 0, 0)
+
+async def test_clear_user_memory(mock_redis, memory_manager):
     """Test clearing user memory."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        await memory_manager.clear_user_memory("test_user")
-        
-        # Verify delete was called with both conversation and session keys
-        mock_client.delete.assert_called_once_with("conversation:test_user", "session:test_user")
-
-@pytest.mark.asyncio
-async def test_get_memory_stats():
+    await memory_manager.clear_user_memory("test_user")
+    
+    # Verify delete was called with both conversation and session keys
+    mock_redis.delete.assert_called_once_with("conversation:test_user", "session:test_user")
+
+async def test_get_memory_stats(mock_redis, memory_manager, monkeypatch):
     """Test getting memory statistics."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        # Mock Redis responses
-        mock_client.keys.side_effect = [
-            ["conversation:user1", "conversation:user2"],  # conversation keys
-            ["session:user1", "session:user2"]  # session keys
-        ]
-        mock_client.info.return_value = {"used_memory_human": "1.2M"}
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        stats = await memory_manager.get_memory_stats()
-        
-        # Use type name comparison instead of isinstance
-        assert type(stats).__name__ == "MemoryStats"
-        assert stats.active_conversations == 2
-        assert stats.active_sessions == 2
-        assert stats.memory_usage == "1.2M"
-        assert stats.ttl_hours == 24
-
-@pytest.mark.asyncio
-async def test_close_connection():
+    keys_by_pattern = {
+        "conversation:*": ["conversation:user1", "conversation:user2"],
+        "session:*": ["session:user1", "session:user2"]
+    }
+
+    async def scan_iter(match, count):
+        for key in keys_by_pattern[match]:
+            yield key
+
+    # Mock Redis responses; scan_iter is a plain method returning an async iterator
+    monkeypatch.setattr(mock_redis, "scan_iter", MagicMock(side_effect=scan_iter))
+    mock_redis.info.return_value = {"used_memory_human": "1.2M"}
+
+    stats = await memory_manager.get_memory_stats()
+    
+    # Use type name comparison instead of isinstance
+    assert type(stats).__name__ == "MemoryStats"
+    assert stats.active_conversations == 2
+    assert stats.active_sessions == 2
+    assert stats.memory_usage == "1.2M"
+    assert stats.ttl_hours == 24
+    mock_redis.keys.assert_not_called()
+
+async def test_close_connection(mock_redis, memory_manager):
     """Test closing Redis connection."""
-    with patch('src.database.redis_connection.get_redis_client') as mock_get_client:
-        mock_client = AsyncMock()
-        mock_get_client.return_value = mock_client
-        
-        memory_manager = RedisMemoryManager()
-        # Set the redis_client directly to avoid real connection
-        memory_manager.redis_client = mock_client
-        
-        await memory_manager.close()
-        
-        mock_client.close.assert_called_once()
-
-@pytest.mark.asyncio
+    await memory_manager.close()
+    
+    mock_redis.close.assert_called_once()
+
 async def test_close_connection_no_client():
     """Test closing Redis connection when no client exists."""
     memory_manager = RedisMemoryManager()
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from core.semantic_cache import SemanticResponseCache
+from core.metrics import CACHE_HITS, CACHE_MISSES
+from core.hybrid_memory_manager import MemoryContext
+from src.features.services.rag_service import RAGService, drain_background_tasks
+
+
+def test_semantic_cache_hit_and_miss():
+    cache = SemanticResponseCache(threshold=0.92)
+    cache.add("user_1", [1.0, 0.0, 0.0], "cached answer")
+
+    # Near-duplicate query (cosine ~0.995) hits, orthogonal query misses
+    assert cache.lookup("user_1", [1.0, 0.1, 0.0]) == "cached answer"
+    assert cache.lookup("user_1", [0.0, 1.0, 0.0]) is None
+    # Entries are per user
+    assert cache.lookup("user_2", [1.0, 0.0, 0.0]) is None
+    assert cache.get_stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_semantic_cache_ttl_expiry():
+    cache = SemanticResponseCache(ttl_seconds=300)
+    with patch("core.semantic_cache.time.monotonic", return_value=1000.0):
+        cache.add("user_1", [1.0, 0.0], "old answer")
+    with patch("core.semantic_cache.time.monotonic", return_value=1301.0):
+        assert cache.lookup("user_1", [1.0, 0.0]) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_semantic_cache_lru_eviction():
+    cache = SemanticResponseCache(max_entries=2)
+    cache.add("user_1", [1.0, 0.0, 0.0], "a")
+    cache.add("user_1", [0.0, 1.0, 0.0], "b")
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.lookup("user_1", [1.0, 0.0, 0.0]) == "a"
+    cache.add("user_1", [0.0, 0.0, 1.0], "c")
+
+    assert cache.lookup("user_1", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("user_1", [1.0, 0.0, 0.0]) == "a"
+    assert cache.lookup("user_1", [0.0, 0.0, 1.0]) == "c"
+
+
+@pytest.fixture
+def cached_rag_service():
+    """RAGService with the semantic cache switched on and OpenAI/memory mocked."""
+    rag_service = RAGService()
+    rag_service.response_cache = SemanticResponseCache()
+    rag_service.openai_client = AsyncMock()
+    rag_service.openai_client.get_embeddings = AsyncMock(return_value=[[0.3, 0.4, 0.5]])
+    rag_service.openai_client.get_chat_completion = AsyncMock(return_value="Generated answer")
+    rag_service.hybrid_memory = AsyncMock()
+    rag_service.hybrid_memory.get_context_for_user = AsyncMock(return_value=MemoryContext())
+    rag_service.hybrid_memory.add_conversation_turn = AsyncMock(return_value={"long_term_stored": False})
+    return rag_service
+
+
+def test_semantic_cache_disabled_by_default():
+    assert RAGService().response_cache is None
+
+
+async def test_process_user_message_uses_semantic_cache(cached_rag_service):
+    rag_service = cached_rag_service
+    hits_before = CACHE_HITS.labels(kind="semantic")._value.get()
+    misses_before = CACHE_MISSES.labels(kind="semantic")._value.get()
+
+    first = await rag_service.process_user_message("What is a P/E ratio?", user_id="user_1")
+    second = await rag_service.process_user_message("what is a p/e ratio", user_id="user_1")
+
+    await drain_background_tasks()
+
+    assert first == second == "Generated answer"
+    rag_service.openai_client.get_chat_completion.assert_awaited_once()
+    # Both turns are still recorded in memory
+    assert rag_service.hybrid_memory.add_conversation_turn.await_count == 2
+    assert CACHE_HITS.labels(kind="semantic")._value.get() == hits_before + 1
+    assert CACHE_MISSES.labels(kind="semantic")._value.get() == misses_before + 1
+
+
+async def test_semantic_cache_skipped_when_conversation_has_recent_turns(cached_rag_service):
+    rag_service = cached_rag_service
+    await rag_service.process_user_message("Tell me about AAPL", user_id="user_1")
+    rag_service.hybrid_memory.get_context_for_user.return_value = MemoryContext(
+        short_term_context="[12:00] User: Tell me about AAPL"
+    )
+
+    await rag_service.process_user_message("Tell me about AAPL", user_id="user_1")
+    await drain_background_tasks()
+
+    # The repeat follows a turn the cached answer never saw, so it goes back to the model
+    assert rag_service.openai_client.get_chat_completion.await_count == 2
+
+
+async def test_semantic_cache_not_used_for_anonymous_callers(cached_rag_service):
+    rag_service = cached_rag_service
+    await rag_service.process_user_message("What is a P/E ratio?")
+    await rag_service.process_user_message("What is a P/E ratio?")
+    await drain_background_tasks()
+
+    assert rag_service.openai_client.get_chat_completion.await_count == 2
+    rag_service.openai_client.get_embeddings.assert_not_awaited()
+    assert rag_service.response_cache.get_stats()["entries"] == 0
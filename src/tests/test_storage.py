@@ -0,0 +1,25 @@
+import pytest
+from core.utils import storage
+from core.utils.storage import sanitize_filename, save_upload
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("report.pdf", "report.pdf"),
+    ("../../etc/passwd", "passwd"),
+    ("C:\\Users\\me\\report.pdf", "report.pdf"),
+    ("..", "upload"),
+    ("", "upload"),
+    (None, "upload"),
+])
+def test_sanitize_filename(filename, expected):
+    assert sanitize_filename(filename) == expected
+
+
+async def test_save_upload_local(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "UPLOAD_DIR", str(tmp_path))
+
+    path = await save_upload("abc123", "test.pdf", b"%PDF-1.4")
+
+    assert path == str(tmp_path / "abc123_test.pdf")
+    assert (tmp_path / "abc123_test.pdf").read_bytes() == b"%PDF-1.4"
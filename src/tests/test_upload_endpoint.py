@@ -1,13 +1,16 @@
 import io
-import os
-from fastapi.testclient import TestClient
-from src.main import app
-from unittest.mock import patch, AsyncMock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 import pytest
-import json
+import msgspec
+from starlette.datastructures import Headers, UploadFile
+from core.qdrant_client import QdrantMemoryClient
+from core.utils import storage
+from features.endpoints.upload import upload_pdf
+from features.models.msgspec.upload import PDFUploadResponse
 
-TEST_PDF_PATH = 'data/test/test_01.pdf'
-UPLOAD_DIR = 'data/uploads'
+# Built once and shared by every fake embedding; nothing downstream mutates it
+FAKE_EMBEDDING = [0.1] * 1536
 
 # Use the correct endpoint path based on router inclusion
 QDRANT_DOCS_PATH = "/qdrant/documents"  # Change to "/upload/qdrant/documents" if router is included with prefix
@@ -19,110 +22,144 @@ def make_fake_points(ids):
             self.payload = {"metadata": {"document_id": doc_id}}
     return [FakePoint(i, doc_id) for i, doc_id in enumerate(ids)]
 
-def test_get_all_documents_id():
-    from src.main import app
-    client = TestClient(app)
-    with patch('core.qdrant_client.QdrantMemoryClient.get_all_points', new_callable=AsyncMock) as mock_get_all_points, \
-         patch('core.qdrant_client.QdrantMemoryClient.connect', new_callable=AsyncMock):
-        # Simulate points with document_ids
-        mock_get_all_points.return_value = make_fake_points(["doc1", "doc2", "doc1"])
-        response = client.get(QDRANT_DOCS_PATH + "?collection_name=test_collection")
+@pytest.fixture(autouse=True)
+def upload_mocks(monkeypatch):
+    """
+    Stub the Qdrant and OpenAI calls every endpoint in this module makes.
+
+    get_embeddings is replaced where upload.py looks it up (it imports the function by
+    name), and returns one fake vector per chunk. Tests that inspect a call take this
+    fixture by name.
+    """
+    mocks = SimpleNamespace(
+        connect=AsyncMock(),
+        close=AsyncMock(),
+        create_collection=AsyncMock(),
+        store_memory_items=AsyncMock(),
+        get_all_points=AsyncMock(return_value=[]),
+        delete_points_by_document_ids=AsyncMock(return_value=[]),
+        get_embeddings=MagicMock(side_effect=lambda texts, **_: [FAKE_EMBEDDING] * len(texts))
+    )
+    monkeypatch.setattr(QdrantMemoryClient, "connect", mocks.connect)
+    monkeypatch.setattr(QdrantMemoryClient, "close", mocks.close)
+    monkeypatch.setattr(QdrantMemoryClient, "create_collection", mocks.create_collection)
+    monkeypatch.setattr(QdrantMemoryClient, "store_memory_items", mocks.store_memory_items)
+    monkeypatch.setattr(QdrantMemoryClient, "get_all_points", mocks.get_all_points)
+    monkeypatch.setattr(QdrantMemoryClient, "delete_points_by_document_ids", mocks.delete_points_by_document_ids)
+    monkeypatch.setattr("features.endpoints.upload.get_embeddings", mocks.get_embeddings)
+    return mocks
+
+@pytest.fixture
+def mock_writer(monkeypatch):
+    """Record local upload writes as (path, bytes) calls instead of touching the disk."""
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    writer = MagicMock()
+    monkeypatch.setattr(storage, "_write_bytes", writer)
+    return writer
+
+def test_get_all_documents_id(client, upload_mocks):
+    # Simulate points with document_ids
+    upload_mocks.get_all_points.return_value = make_fake_points(["doc1", "doc2", "doc1"])
+    response = client.get(QDRANT_DOCS_PATH + "?collection_name=test_collection")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["document_ids"]) == {"doc1", "doc2"}
+
+def test_startup_qdrant_client_reused_across_requests(app, client, upload_mocks, monkeypatch):
+    shared = QdrantMemoryClient(collection_name="pdf_documents")
+    monkeypatch.setattr(app.state, "qdrant_clients", {"pdf_documents": shared}, raising=False)
+    upload_mocks.get_all_points.return_value = make_fake_points(["doc1"])
+    for _ in range(3):
+        response = client.get(QDRANT_DOCS_PATH + "?collection_name=pdf_documents")
         assert response.status_code == 200
-        data = response.json()
-        assert set(data["document_ids"]) == {"doc1", "doc2"}
+    upload_mocks.connect.assert_not_awaited()
+    upload_mocks.close.assert_not_awaited()
 
-def test_clean_all_documents_id_array():
-    from src.main import app
-    client = TestClient(app)
-    with patch('core.qdrant_client.QdrantMemoryClient.get_all_points', new_callable=AsyncMock) as mock_get_all_points, \
-         patch('core.qdrant_client.QdrantMemoryClient.connect', new_callable=AsyncMock), \
-         patch('core.qdrant_client.QdrantMemoryClient.delete_points', new_callable=AsyncMock) as mock_delete_points:
-        # Simulate points with document_ids
-        points = make_fake_points(["doc1", "doc2", "doc3"])
-        points[0].id = 101
-        points[1].id = 102
-        points[2].id = 103
-        mock_get_all_points.return_value = points
-        mock_delete_points.return_value = None
-        payload = {"collection_name": "test_collection", "document_ids": ["doc1", "doc3"]}
-        response = client.request(
-            "DELETE",
-            QDRANT_DOCS_PATH,
-            data=json.dumps(payload),
-            headers={"Content-Type": "application/json"}
-        )
+def test_unknown_collection_client_closed_and_not_cached(app, client, upload_mocks, monkeypatch):
+    monkeypatch.setattr(app.state, "qdrant_clients", {}, raising=False)
+    for name in ("made_up_1", "made_up_2"):
+        response = client.get(QDRANT_DOCS_PATH + f"?collection_name={name}")
         assert response.status_code == 200
-        data = response.json()
-        assert set(data["deleted_point_ids"]) == {101, 103}
-        assert data["count"] == 2
+    assert upload_mocks.connect.await_count == 2
+    assert upload_mocks.close.await_count == 2
+    assert app.state.qdrant_clients == {}
 
-@patch('core.qdrant_client.QdrantMemoryClient.connect', new_callable=AsyncMock)
-@patch('core.qdrant_client.QdrantMemoryClient.create_collection', new_callable=AsyncMock)
-@patch('core.qdrant_client.QdrantMemoryClient.store_memory_item', new_callable=AsyncMock)
-@patch('core.utils.embedding.get_embeddings', return_value=[[0.1]*1536]*7)
-def test_upload_pdf(mock_get_embeddings, mock_store_memory_item, mock_create_collection, mock_connect, tmp_path):
-    client = TestClient(app)
-    with open(TEST_PDF_PATH, 'rb') as f:
-        pdf_content = f.read()
+def test_clean_all_documents_id_array(client, upload_mocks):
+    # Simulate the points matched by the document_id filter
+    upload_mocks.delete_points_by_document_ids.return_value = [101, 103]
+    payload = {"collection_name": "test_collection", "document_ids": ["doc1", "doc3"]}
+    response = client.request("DELETE", QDRANT_DOCS_PATH, json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["deleted_point_ids"]) == {101, 103}
+    assert data["count"] == 2
+    upload_mocks.delete_points_by_document_ids.assert_awaited_once_with(["doc1", "doc3"])
+
+def test_upload_pdf(client, pdf_bytes, mock_writer):
     files = {
-        'file': ('test.pdf', io.BytesIO(pdf_content), 'application/pdf'),
+        'file': ('test.pdf', io.BytesIO(pdf_bytes), 'application/pdf'),
     }
     data = {
         'title': 'Test PDF',
         'description': 'A test PDF file',
         'tags': 'test,example,upload'
     }
-    uploaded_file_path = None
-    try:
-        response = client.post("/upload", files=files, data=data)
-        assert response.status_code == 200
-        resp_json = response.json()
-        assert resp_json['filename'] == 'test.pdf'
-        assert resp_json['status'] == 'success'
-        assert resp_json['document_id']
-        # Check that the file was created in the uploads directory
-        files_in_dir = os.listdir(UPLOAD_DIR)
-        uploaded_file_path = os.path.join(UPLOAD_DIR, resp_json['document_id'] + '_test.pdf')
-        assert any(resp_json['document_id'] in fname for fname in files_in_dir)
-        print("test is working /upload endpoint")
-    finally:
-        # Only delete the file created by this test
-        if uploaded_file_path and os.path.exists(uploaded_file_path):
-            os.remove(uploaded_file_path)
+    response = client.post("/upload", files=files, data=data)
+    assert response.status_code == 200
+    resp_json = response.json()
+    assert resp_json['filename'] == 'test.pdf'
+    assert resp_json['status'] == 'success'
+    assert resp_json['document_id']
+    # The raw PDF was handed to the storage writer under its document id
+    saved_path, saved_bytes = mock_writer.call_args.args
+    assert saved_path.name == f"{resp_json['document_id']}_test.pdf"
+    assert saved_bytes == pdf_bytes
+
+async def test_upload_pdf_with_mocked_qdrant(app, pdf_bytes, mock_writer, upload_mocks, monkeypatch):
+    # Calls the route handler directly; the multipart/HTTP layer is covered by test_upload_pdf
+    monkeypatch.setattr("features.endpoints.upload.chunk_text", MagicMock(return_value=["chunk"] * 7))
+    file = UploadFile(
+        io.BytesIO(pdf_bytes),
+        size=len(pdf_bytes),
+        filename="test.pdf",
+        headers=Headers({"content-type": "application/pdf"})
+    )
+    response = await upload_pdf(
+        SimpleNamespace(app=app),
+        file=file,
+        title="Test PDF",
+        description="A test PDF file",
+        tags="test,example,upload"
+    )
+    assert response.status_code == 200
+    result = msgspec.json.decode(response.body, type=PDFUploadResponse)
+    assert result.filename == 'test.pdf'
+    assert result.status == 'success'
+    assert result.document_id
+    # The raw PDF was handed to the storage writer under its document id
+    mock_writer.assert_called_once()
+    assert mock_writer.call_args.args[0].name == f"{result.document_id}_test.pdf"
+    # All chunks are embedded in one batched call and stored with a single bulk call
+    upload_mocks.get_embeddings.assert_called_once()
+    assert upload_mocks.get_embeddings.call_args.args[0] == ["chunk"] * 7
+    upload_mocks.store_memory_items.assert_awaited_once()
+    assert len(upload_mocks.store_memory_items.call_args.kwargs["contents"]) == 7
+    assert len(upload_mocks.store_memory_items.call_args.kwargs["embeddings"]) == 7
+    assert upload_mocks.store_memory_items.call_args.kwargs["metadata"]["tags"] == ["test", "example", "upload"]
 
-@patch('core.qdrant_client.QdrantMemoryClient.connect', new_callable=AsyncMock)
-@patch('core.qdrant_client.QdrantMemoryClient.create_collection', new_callable=AsyncMock)
-@patch('core.qdrant_client.QdrantMemoryClient.store_memory_item', new_callable=AsyncMock)
-@patch('core.utils.embedding.get_embeddings', return_value=[[0.1]*1536]*7)
-@patch('core.utils.parser.chunk_text', return_value=["chunk"]*7)
-def test_upload_pdf_with_mocked_qdrant(mock_chunk_text, mock_get_embeddings, mock_store_memory_item, mock_create_collection, mock_connect, tmp_path):
-    client = TestClient(app)
-    with open(TEST_PDF_PATH, 'rb') as f:
-        pdf_content = f.read()
+def test_upload_rejects_non_pdf_content(client, upload_mocks):
     files = {
-        'file': ('test.pdf', io.BytesIO(pdf_content), 'application/pdf'),
+        'file': ('fake.pdf', io.BytesIO(b"MZ\x90\x00 not a pdf"), 'application/pdf'),
     }
-    data = {
-        'title': 'Test PDF',
-        'description': 'A test PDF file',
-        'tags': 'test,example,upload'
+    response = client.post("/upload", files=files, data={'title': 'Fake PDF'})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "File is not a valid PDF."
+    upload_mocks.store_memory_items.assert_not_awaited()
+
+def test_upload_rejects_oversized_pdf(client, monkeypatch):
+    files = {
+        'file': ('big.pdf', io.BytesIO(b"%PDF-1.4" + b"0" * 64), 'application/pdf'),
     }
-    uploaded_file_path = None
-    try:
-        response = client.post("/upload", files=files, data=data)
-        assert response.status_code == 200
-        resp_json = response.json()
-        assert resp_json['filename'] == 'test.pdf'
-        assert resp_json['status'] == 'success'
-        assert resp_json['document_id']
-        # Check that the file was created in the uploads directory
-        files_in_dir = os.listdir(UPLOAD_DIR)
-        uploaded_file_path = os.path.join(UPLOAD_DIR, resp_json['document_id'] + '_test.pdf')
-        assert any(resp_json['document_id'] in fname for fname in files_in_dir)
-        # Assert store_memory_item called for each chunk
-        assert mock_store_memory_item.await_count == 7
-        print("test is working /upload endpoint with mocked qdrant")
-    finally:
-        # Only delete the file created by this test
-        if uploaded_file_path and os.path.exists(uploaded_file_path):
-            os.remove(uploaded_file_path) 
\ No newline at end of file
+    monkeypatch.setattr('features.endpoints.upload.MAX_UPLOAD_BYTES', 16)
+    response = client.post("/upload", files=files, data={'title': 'Big PDF'})
+    assert response.status_code == 413